@@ -0,0 +1,171 @@
+import numpy as np
+
+# Motore AHP (Analytic Hierarchy Process) vettorizzato.
+#
+# I giudizi a coppie sono codificati come indici interi, non come testo:
+# per ogni coppia (i, j) con i < j, in ordine di riga (np.triu_indices),
+# l'indice k seleziona VALORI_GIUDIZIO[k], cioè il valore di a_ij.
+#   0      -> equamente importanti (1)
+#   1..4   -> i più importante di j (3, 5, 7, 9)
+#   5..8   -> j più importante di i (1/3, 1/5, 1/7, 1/9)
+# Tutte le funzioni lavorano su pile di matrici (N, n, n), così si possono
+# ricalcolare in un'unica chiamata i pesi di tutti i partecipanti.
+
+VALORI_GIUDIZIO = np.array([1, 3, 5, 7, 9, 1 / 3, 1 / 5, 1 / 7, 1 / 9])
+
+# Indice di consistenza casuale (Saaty), indicizzato per n (fino a 10)
+INDICE_CASUALE = np.array([0, 0, 0, 0.58, 0.90, 1.12, 1.24, 1.32, 1.41, 1.45, 1.49])
+
+# Soglia usuale oltre la quale i giudizi sono considerati incoerenti
+SOGLIA_CR = 0.10
+
+SEPARATORE_GIUDIZI = ";"
+
+
+def numero_coppie(n: int) -> int:
+    return n * (n - 1) // 2
+
+
+def matrici_da_giudizi(giudizi, n: int) -> np.ndarray:
+    """
+    Costruisce le matrici di confronto reciproche dai giudizi codificati.
+
+    Parameters
+    ----------
+    giudizi : array-like (N, n*(n-1)/2) oppure (n*(n-1)/2,)
+        Indici dei giudizi per ciascuna coppia, in ordine di riga.
+    n : int
+        Numero di elementi confrontati.
+
+    Returns
+    -------
+    np.ndarray (N, n, n)
+    """
+    giudizi = np.atleast_2d(np.asarray(giudizi, dtype=int))
+    iu, ju = np.triu_indices(n, 1)
+    valori = VALORI_GIUDIZIO[giudizi]
+    matrici = np.ones((giudizi.shape[0], n, n))
+    matrici[:, iu, ju] = valori
+    matrici[:, ju, iu] = 1 / valori
+    return matrici
+
+
+def _normalizza(pesi: np.ndarray) -> np.ndarray:
+    return pesi / pesi.sum(axis=-1, keepdims=True)
+
+
+def pesi_autovettore(matrici: np.ndarray) -> np.ndarray:
+    """
+    Autovettore principale di ogni matrice della pila (np.linalg.eig su (N, n, n)).
+    """
+    autovalori, autovettori = np.linalg.eig(matrici)
+    idx = np.argmax(autovalori.real, axis=-1)
+    vettori = np.take_along_axis(autovettori.real, idx[:, None, None], axis=2)[..., 0]
+    return _normalizza(np.abs(vettori))
+
+
+def pesi_potenza(matrici: np.ndarray, tol: float = 1e-10, max_iter: int = 100) -> np.ndarray:
+    """
+    Autovettore principale con il metodo delle potenze, su tutta la pila insieme.
+    """
+    n = matrici.shape[-1]
+    pesi = np.full(matrici.shape[:-1], 1 / n)
+    for _ in range(max_iter):
+        nuovi = _normalizza(np.einsum("nij,nj->ni", matrici, pesi))
+        if np.max(np.abs(nuovi - pesi)) < tol:
+            return nuovi
+        pesi = nuovi
+    return pesi
+
+
+def pesi_media_geometrica(matrici: np.ndarray) -> np.ndarray:
+    """
+    Approssimazione rapida: media geometrica delle righe, normalizzata.
+    """
+    return _normalizza(np.exp(np.log(matrici).mean(axis=-1)))
+
+
+METODI = {
+    "autovettore": pesi_autovettore,
+    "potenza": pesi_potenza,
+    "geometrica": pesi_media_geometrica,
+}
+
+
+def calcola_pesi(matrici, metodo: str = "autovettore") -> np.ndarray:
+    """
+    Vettori di priorità (N, n) per una pila di matrici (N, n, n)
+    con il metodo scelto tra 'autovettore', 'potenza' e 'geometrica'.
+    """
+    matrici = np.asarray(matrici, dtype=float)
+    if matrici.ndim == 2:
+        matrici = matrici[None]
+    return METODI[metodo](matrici)
+
+
+def consistenza(matrici, pesi) -> dict:
+    """
+    λmax, indice (CI) e rapporto (CR) di consistenza per ogni matrice della pila.
+    λmax è stimato come media di (A·w)_i / w_i, valido per qualsiasi metodo.
+    """
+    matrici = np.asarray(matrici, dtype=float)
+    if matrici.ndim == 2:
+        matrici = matrici[None]
+    pesi = np.atleast_2d(pesi)
+    n = matrici.shape[-1]
+    lambda_max = (np.einsum("nij,nj->ni", matrici, pesi) / pesi).mean(axis=-1)
+    ci = (lambda_max - n) / (n - 1) if n > 1 else np.zeros_like(lambda_max)
+    ri = INDICE_CASUALE[n] if n < len(INDICE_CASUALE) else INDICE_CASUALE[-1]
+    cr = ci / ri if ri > 0 else np.zeros_like(ci)
+    return {"lambda_max": lambda_max, "ci": ci, "cr": cr}
+
+
+def analizza(matrici, metodo: str = "autovettore") -> dict:
+    """
+    Pesi e consistenza nello stesso passaggio: dict con 'pesi' (N, n),
+    'lambda_max', 'ci' e 'cr' (N,).
+    """
+    pesi = calcola_pesi(matrici, metodo)
+    return {"pesi": pesi, **consistenza(matrici, pesi)}
+
+
+def codifica_giudizi(giudizi) -> str:
+    """
+    Giudizi di una risposta come testo da salvare nel foglio (es. '0;3;5;0;...').
+    """
+    return SEPARATORE_GIUDIZI.join(str(int(k)) for k in giudizi)
+
+
+def decodifica_giudizi(testi, n: int):
+    """
+    Converte i testi salvati in una matrice (N, n*(n-1)/2) di indici.
+    Restituisce anche la maschera delle righe valide.
+    """
+    p = numero_coppie(n)
+    giudizi = np.zeros((len(testi), p), dtype=int)
+    valide = np.zeros(len(testi), dtype=bool)
+    for r, testo in enumerate(testi):
+        parti = str(testo).split(SEPARATORE_GIUDIZI) if testo not in (None, "") else []
+        if len(parti) == p and all(x.strip().isdigit() and int(x) < len(VALORI_GIUDIZIO) for x in parti):
+            giudizi[r] = [int(x) for x in parti]
+            valide[r] = True
+    return giudizi, valide
+
+
+def ricalcola_consistenza(testi, n: int, metodo: str = "autovettore") -> dict:
+    """
+    Ricalcolo in blocco di pesi e consistenza per tutte le risposte salvate
+    (colonna 'Giudizi'). Le righe non valide hanno valori NaN.
+    """
+    giudizi, valide = decodifica_giudizi(list(testi), n)
+    risultato = {
+        "pesi": np.full((len(valide), n), np.nan),
+        "lambda_max": np.full(len(valide), np.nan),
+        "ci": np.full(len(valide), np.nan),
+        "cr": np.full(len(valide), np.nan),
+    }
+    if valide.any():
+        calcolo = analizza(matrici_da_giudizi(giudizi[valide], n), metodo)
+        for chiave, valori in calcolo.items():
+            risultato[chiave][valide] = valori
+    return risultato
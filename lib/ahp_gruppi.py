@@ -0,0 +1,171 @@
+import threading
+import numpy as np
+import pandas as pd
+import streamlit as st
+from lib.ahp import matrici_da_giudizi, decodifica_giudizi, calcola_pesi
+
+# Aggregazione AHP di gruppo, incrementale e condivisa dal processo.
+#
+# Per ogni gruppo (tutti, quartiere, tavola rotonda) si tengono solo somme e
+# conteggi: somma dei vettori di priorità (media aritmetica dei pesi) e somma
+# dei logaritmi delle matrici di confronto (media geometrica dei giudizi,
+# da cui si ricavano i pesi di gruppo). Ogni nuova risposta costa O(n²) e i
+# pesi di gruppo sono disponibili senza rileggere lo storico.
+#
+# Gli aggregati si alimentano solo dal foglio 'Pesi Parametri' (copia locale,
+# vedi aggiorna_da_tabella), quindi contano solo le risposte salvate davvero.
+# Ogni risposta è identificata da (partecipante, timestamp) e non viene
+# contata due volte.
+
+LIVELLI = ("tutti", "quartiere", "tavola")
+
+# Elementi AHP come colonne del foglio 'Pesi Parametri' (scritte dalla pagina 3):
+# chiave dell'aggregatore condiviso dalle pagine 4 e 6
+ELEMENTI_VERDE = (
+    "Accessibilità del verde",
+    "Biodiversità",
+    "Manutenzione e pulizia",
+    "Funzione sociale (es. luoghi di incontro)",
+    "Funzione ambientale (es. ombra, qualità aria)",
+)
+
+
+class AggregatoreAHP:
+    def __init__(self, elementi):
+        self.elementi = list(elementi)
+        self.n = len(self.elementi)
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._gruppi = {}
+        self._visti = set()
+        self._righe_lette = 0
+
+    def _gruppo(self, livello, valore):
+        chiave = (livello, valore)
+        if chiave not in self._gruppi:
+            self._gruppi[chiave] = {
+                "n_pesi": 0,
+                "somma_pesi": np.zeros(self.n),
+                "n_giudizi": 0,
+                "somma_log": np.zeros((self.n, self.n)),
+            }
+        return self._gruppi[chiave]
+
+    def aggiungi_risposta(self, chiave, quartiere, tavola, pesi, giudizi=None):
+        """
+        Aggiunge una risposta ai gruppi di appartenenza in O(n²).
+        Restituisce False se la risposta era già stata contata.
+
+        Parameters
+        ----------
+        chiave : tuple
+            Identificativo della risposta, es. (ID Partecipante, Timestamp).
+        quartiere, tavola : str
+            Gruppi di appartenenza (valori vuoti vengono ignorati).
+        pesi : array-like (n,)
+            Vettore di priorità, nell'ordine di self.elementi.
+        giudizi : array-like, opzionale
+            Giudizi codificati (vedi lib.ahp) per la media geometrica.
+        """
+        pesi = np.asarray(pesi, dtype=float)
+        log_matrice = None
+        if giudizi is not None:
+            log_matrice = np.log(matrici_da_giudizi(giudizi, self.n)[0])
+        with self._lock:
+            if chiave in self._visti:
+                return False
+            self._visti.add(chiave)
+            for livello, valore in zip(LIVELLI, (None, quartiere, tavola)):
+                if livello != "tutti" and (valore is None or valore == "" or pd.isna(valore)):
+                    continue
+                gruppo = self._gruppo(livello, valore)
+                if not np.isnan(pesi).any():
+                    gruppo["n_pesi"] += 1
+                    gruppo["somma_pesi"] += pesi
+                if log_matrice is not None:
+                    gruppo["n_giudizi"] += 1
+                    gruppo["somma_log"] += log_matrice
+        return True
+
+    def aggiorna_da_tabella(self, df: pd.DataFrame):
+        """
+        Aggiunge le righe del foglio 'Pesi Parametri' non ancora lette.
+        Il foglio è in sola aggiunta: si elaborano solo le righe nuove.
+        Se il foglio si accorcia (righe cancellate) gli aggregati si ricostruiscono.
+        """
+        with self._lock:
+            if len(df) < self._righe_lette:
+                self._reset()
+            inizio = self._righe_lette
+        nuove = df.iloc[inizio:]
+        if not nuove.empty:
+            pesi = (
+                nuove.reindex(columns=self.elementi)
+                .apply(lambda c: pd.to_numeric(c.astype(str).str.replace(",", ".", regex=False), errors="coerce"))
+                .to_numpy()
+            )
+            if "Giudizi" in nuove.columns:
+                giudizi, valide = decodifica_giudizi(nuove["Giudizi"].tolist(), self.n)
+            else:
+                giudizi, valide = None, np.zeros(len(nuove), dtype=bool)
+            partecipanti = nuove.get("ID Partecipante", nuove.get("Utente", pd.Series("", index=nuove.index)))
+            timestamp = nuove.get("Timestamp", pd.Series("", index=nuove.index))
+            quartieri = nuove.get("Quartiere", pd.Series("", index=nuove.index))
+            tavole = nuove.get("Tavola rotonda", pd.Series("", index=nuove.index))
+            for r in range(len(nuove)):
+                self.aggiungi_risposta(
+                    (str(partecipanti.iloc[r]), str(timestamp.iloc[r])),
+                    quartieri.iloc[r], tavole.iloc[r], pesi[r],
+                    giudizi[r] if valide[r] else None,
+                )
+        with self._lock:
+            self._righe_lette = len(df)
+
+    def tabella_pesi(self, livello: str = "tavola") -> pd.DataFrame:
+        """
+        Media aritmetica dei pesi per gruppo del livello indicato, con il conteggio 'N'.
+        """
+        with self._lock:
+            righe = {
+                valore: list(g["somma_pesi"] / g["n_pesi"]) + [g["n_pesi"]]
+                for (liv, valore), g in self._gruppi.items()
+                if liv == livello and g["n_pesi"] > 0
+            }
+        return pd.DataFrame.from_dict(righe, orient="index", columns=self.elementi + ["N"]).sort_index()
+
+    def tabella_gruppo(self, livello: str = "tavola") -> pd.DataFrame:
+        """
+        Pesi di gruppo dalla media geometrica dei giudizi, con il conteggio 'N'.
+        """
+        with self._lock:
+            gruppi = [
+                (valore, g["somma_log"] / g["n_giudizi"], g["n_giudizi"])
+                for (liv, valore), g in self._gruppi.items()
+                if liv == livello and g["n_giudizi"] > 0
+            ]
+        if not gruppi:
+            return pd.DataFrame(columns=self.elementi + ["N"])
+        pesi = calcola_pesi(np.exp(np.stack([m for _, m, _ in gruppi])))
+        tabella = pd.DataFrame(pesi, index=[v for v, _, _ in gruppi], columns=self.elementi)
+        tabella["N"] = [c for _, _, c in gruppi]
+        return tabella.sort_index()
+
+    def pesi_medi(self, livello: str = "tutti", valore=None):
+        """
+        Media aritmetica dei pesi di un singolo gruppo (Series), None se vuoto.
+        """
+        with self._lock:
+            gruppo = self._gruppi.get((livello, valore))
+            if gruppo is None or gruppo["n_pesi"] == 0:
+                return None
+            return pd.Series(gruppo["somma_pesi"] / gruppo["n_pesi"], index=self.elementi)
+
+
+@st.cache_resource(show_spinner=False)
+def get_aggregatore(elementi: tuple) -> AggregatoreAHP:
+    """
+    Aggregatore condiviso dal processo per l'elenco di elementi indicato.
+    """
+    return AggregatoreAHP(elementi)
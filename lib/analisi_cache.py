@@ -0,0 +1,87 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+# Memoizzazione dei risultati delle analisi, condivisa dal processo.
+#
+# La chiave è (nome dell'analisi, tavola rotonda, impronta dei dati, parametri):
+# tornare su un'analisi già vista per gli stessi dati costa solo il rendering.
+# Le voci sono tenute in ordine LRU ed eliminate oltre MAX_VOCI o quando la
+# memoria stimata supera ANALISI_CACHE_MB. Quando cambia l'impronta dei dati
+# le voci calcolate sui dati precedenti vengono scartate tutte. I risultati
+# restituiti sono condivisi tra le sessioni e non vanno modificati.
+
+MAX_MB = float(os.getenv("ANALISI_CACHE_MB", "64"))
+MAX_VOCI = int(os.getenv("ANALISI_CACHE_VOCI", "256"))
+
+_LOCK = threading.Lock()
+_VOCI = OrderedDict()
+_STATO = {"byte": 0, "impronta": None}
+
+
+def _dimensione(valore) -> int:
+    # Stima della memoria occupata da un risultato (byte)
+    if isinstance(valore, pd.DataFrame):
+        return int(valore.memory_usage(index=True, deep=True).sum())
+    if isinstance(valore, pd.Series):
+        return int(valore.memory_usage(index=True, deep=True))
+    if isinstance(valore, np.ndarray):
+        return int(valore.nbytes)
+    if isinstance(valore, dict):
+        return sys.getsizeof(valore) + sum(_dimensione(v) for v in valore.values())
+    if isinstance(valore, (list, tuple)):
+        return sys.getsizeof(valore) + sum(_dimensione(v) for v in valore)
+    return sys.getsizeof(valore)
+
+
+def _libera_spazio():
+    limite = MAX_MB * 1024 * 1024
+    while _VOCI and (_STATO["byte"] > limite or len(_VOCI) > MAX_VOCI):
+        _, (_, dimensione) = _VOCI.popitem(last=False)
+        _STATO["byte"] -= dimensione
+
+
+def analisi_memoizzata(nome, tavola, impronta, calcolo, *parametri):
+    """
+    Restituisce il risultato dell'analisi dalla cache o lo calcola con calcolo().
+
+    Parameters
+    ----------
+    nome : str
+        Nome dell'analisi (es. la voce del menu).
+    tavola : str or None
+        Tavola rotonda analizzata (None per i confronti tra tavole).
+    impronta : str
+        Impronta dei dati (vedi lib.impronta.dataframe_fingerprint).
+    calcolo : callable
+        Funzione senza argomenti che produce il risultato.
+    parametri : hashable
+        Eventuali parametri aggiuntivi che entrano nella chiave.
+    """
+    chiave = (nome, tavola, impronta) + parametri
+    with _LOCK:
+        if chiave in _VOCI:
+            _VOCI.move_to_end(chiave)
+            return _VOCI[chiave][0]
+
+    risultato = calcolo()
+    dimensione = _dimensione(risultato)
+    with _LOCK:
+        if impronta != _STATO["impronta"]:
+            # Dati aggiornati: i risultati sui dati precedenti non servono più
+            _svuota()
+            _STATO["impronta"] = impronta
+        if chiave not in _VOCI:
+            _VOCI[chiave] = (risultato, dimensione)
+            _STATO["byte"] += dimensione
+            _libera_spazio()
+    return risultato
+
+
+def _svuota():
+    # Da chiamare con _LOCK acquisito
+    _VOCI.clear()
+    _STATO["byte"] = 0
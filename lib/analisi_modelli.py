@@ -0,0 +1,37 @@
+import pandas as pd
+from sklearn.cluster import KMeans
+from sklearn.decomposition import PCA
+from lib.clustering import selezione_k
+
+# Analisi con modelli scikit-learn della pagina 2 (Personas Model).
+# Il modulo viene importato solo dalle voci del menu che lo usano, così la
+# pagina si apre senza caricare scikit-learn. Le funzioni ricevono le
+# feature già standardizzate (lib.feature_partecipanti, colonna 'scalate');
+# le righe con valori mancanti vengono escluse.
+
+
+def kmeans_profilo(scalate: pd.DataFrame, n_clusters: int = 3) -> pd.Series:
+    """
+    Etichette KMeans sulle feature del profilo, indicizzate come i partecipanti.
+    """
+    X = scalate.dropna()
+    etichette = KMeans(n_clusters=n_clusters, random_state=42).fit(X.to_numpy()).labels_
+    return pd.Series(etichette, index=X.index, name="Cluster")
+
+
+def pca_profilo(scalate: pd.DataFrame, ruoli: pd.Series) -> pd.DataFrame:
+    """
+    Proiezione PCA 2D delle feature del profilo, con il ruolo per il colore.
+    """
+    X = scalate.dropna()
+    components = PCA(n_components=2).fit_transform(X.to_numpy())
+    df_pca = pd.DataFrame(components, columns=["PC1", "PC2"], index=X.index)
+    df_pca["Ruolo"] = ruoli.reindex(X.index)
+    return df_pca
+
+
+def selezione_k_profilo(scalate: pd.DataFrame, k_values=range(2, 8)) -> pd.DataFrame:
+    """
+    Inerzia, silhouette e Calinski-Harabasz per k sulle feature del profilo.
+    """
+    return selezione_k(scalate.dropna().to_numpy(), k_values)
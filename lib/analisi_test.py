@@ -0,0 +1,68 @@
+import pandas as pd
+from scipy import stats
+from lib.statistiche import statistiche_per_gruppo
+
+# Test statistici della pagina 2 (Personas Model).
+# Il modulo viene importato solo dalle voci del menu che lo usano, così la
+# pagina si apre senza caricare scipy, statsmodels e scikit-posthocs.
+
+
+def confronto_tavole(df_completo: pd.DataFrame) -> dict:
+    """
+    Medie, ANOVA, normalità, Kruskal-Wallis e post-hoc di Età e Coinvolgimento
+    tra le tavole rotonde, nel formato usato dalla pagina.
+    """
+    eta_media = df_completo.groupby("Tavola rotonda")["Età"].mean().reset_index()
+    coinv_media = df_completo.groupby("Tavola rotonda")["Coinvolgimento"].mean().reset_index()
+
+    # ANOVA, normalità, Kruskal-Wallis e post-hoc in un unico passaggio
+    stat = statistiche_per_gruppo(df_completo, "Tavola rotonda", ["Età", "Coinvolgimento"])
+    riepilogo = stat["riepilogo"].set_index("Variabile")
+    eta, coinv = riepilogo.loc["Età"], riepilogo.loc["Coinvolgimento"]
+    normal_eta, normal_coinv = bool(eta["Normale"]), bool(coinv["Normale"])
+
+    # Tabella dei risultati (Kruskal-Wallis mostrato solo se i dati non sono normali)
+    df_anova = pd.DataFrame({
+        "Variabile": ["Età", "Coinvolgimento"],
+        "F-value (ANOVA)": [eta["F (ANOVA)"], coinv["F (ANOVA)"]],
+        "p-value (ANOVA)": [eta["p (ANOVA)"], coinv["p (ANOVA)"]],
+        "Distribuzione normale?": ["✅" if normal_eta else "❌", "✅" if normal_coinv else "❌"],
+        "Test alternativo": ["Kruskal-Wallis" if not normal_eta else "-", "Kruskal-Wallis" if not normal_coinv else "-"],
+        "H-value (Kruskal)": [eta["H (Kruskal)"] if not normal_eta else None,
+                              coinv["H (Kruskal)"] if not normal_coinv else None],
+        "p-value (Kruskal)": [eta["p (Kruskal)"] if not normal_eta else None,
+                              coinv["p (Kruskal)"] if not normal_coinv else None]
+    })
+
+    normalita = stat["normalita"].rename(columns={"Gruppo": "Tavola rotonda"})
+    normalita["Normale (α=0.05)"] = normalita.pop("Normale").map({True: "✅", False: "❌"})
+
+    return {
+        "eta_media": eta_media,
+        "coinv_media": coinv_media,
+        "df_anova": df_anova,
+        "normal_eta": normal_eta,
+        "normal_coinv": normal_coinv,
+        "anova_eta_p": eta["p (ANOVA)"],
+        "anova_coinv_p": coinv["p (ANOVA)"],
+        "kruskal_eta_p": eta["p (Kruskal)"] if not normal_eta else None,
+        "kruskal_coinv_p": coinv["p (Kruskal)"] if not normal_coinv else None,
+        "posthoc": {
+            f"Post-hoc {riepilogo.loc[col, 'Post-hoc']} – {col}": tabella
+            for col, tabella in stat["posthoc"].items()
+        },
+        "normalita": {
+            col: normalita[normalita["Variabile"] == col].drop(columns="N").reset_index(drop=True)
+            for col in ["Età", "Coinvolgimento"]
+        },
+    }
+
+
+def test_anova_normalita(df: pd.DataFrame):
+    """
+    p-value di Shapiro-Wilk per le feature del profilo e dell'ANOVA
+    del coinvolgimento per ruolo.
+    """
+    shapiro_p = {col: stats.shapiro(df[col])[1] for col in ["Età", "Coinvolgimento", "Conoscenza tema"]}
+    gruppi = [df[df["Ruolo"] == ruolo]["Coinvolgimento"] for ruolo in df["Ruolo"].unique()]
+    return shapiro_p, stats.f_oneway(*gruppi)[1]
@@ -0,0 +1,114 @@
+import os
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.cluster import KMeans
+from sklearn.metrics import pairwise_distances, silhouette_score, calinski_harabasz_score
+from lib.impronta import cache_per_impronta
+
+# Servizio di clustering KMeans con sweep dei k precalcolato.
+#
+# Per ogni versione dei dati (impronta del contenuto) si addestrano una sola
+# volta tutti i k dell'intervallo, in parallelo sui core disponibili, e si
+# conservano etichette, centroidi e inerzia. Spostare lo slider del numero di
+# cluster o cambiare vista diventa una semplice lettura dalla cache.
+#
+# selezione_k confronta più k con gomito (inerzia), silhouette e
+# Calinski–Harabasz calcolando la matrice delle distanze una sola volta.
+
+K_RANGE = tuple(range(2, 7))
+RANDOM_STATE = 42
+
+
+def _fit_kmeans(X, k, random_state):
+    modello = KMeans(n_clusters=k, random_state=random_state, n_init=10).fit(X)
+    return k, {
+        "etichette": modello.labels_,
+        "centroidi": modello.cluster_centers_,
+        "inerzia": float(modello.inertia_),
+    }
+
+
+@cache_per_impronta(max_entries=16)
+def _sweep(dati, k_values, random_state):
+    X = dati.to_numpy(dtype=float)
+    k_validi = [k for k in k_values if k <= len(X)]
+    n_jobs = max(1, min(len(k_validi), os.cpu_count() or 1))
+    risultati = Parallel(n_jobs=n_jobs)(
+        delayed(_fit_kmeans)(X, k, random_state) for k in k_validi
+    )
+    return dict(risultati)
+
+
+def kmeans_sweep(df: pd.DataFrame, colonne, k_values=K_RANGE, random_state=RANDOM_STATE) -> dict:
+    """
+    KMeans per tutti i k indicati sulle colonne scelte, una sola volta per
+    versione dei dati. Le righe con valori mancanti vengono escluse.
+
+    Returns
+    -------
+    dict
+        k -> {'etichette': pd.Series (indice di df), 'centroidi': pd.DataFrame,
+        'inerzia': float}. I k maggiori del numero di righe valide sono omessi.
+    """
+    dati = df[list(colonne)].apply(pd.to_numeric, errors="coerce").dropna()
+    if dati.empty:
+        return {}
+    risultati = _sweep(dati, tuple(k_values), random_state)
+    return {
+        k: {
+            "etichette": pd.Series(r["etichette"], index=dati.index, name="Cluster"),
+            "centroidi": pd.DataFrame(r["centroidi"], columns=list(colonne)),
+            "inerzia": r["inerzia"],
+        }
+        for k, r in risultati.items()
+    }
+
+
+def inerzie(risultati: dict) -> pd.Series:
+    """
+    Inerzia per k (curva del gomito) da un risultato di kmeans_sweep.
+    """
+    return pd.Series({k: r["inerzia"] for k, r in risultati.items()}, name="Inerzia", dtype=float)
+
+
+def _valuta_k(X, D, k, random_state):
+    modello = KMeans(n_clusters=k, random_state=random_state, n_init=10).fit(X)
+    return {
+        "k": k,
+        "Inerzia": float(modello.inertia_),
+        "Silhouette": float(silhouette_score(D, modello.labels_, metric="precomputed")),
+        "Calinski-Harabasz": float(calinski_harabasz_score(X, modello.labels_)),
+    }
+
+
+def selezione_k(X, k_values=range(2, 8), random_state=RANDOM_STATE, n_jobs=None) -> pd.DataFrame:
+    """
+    Metriche di selezione del numero di cluster per KMeans: inerzia (gomito),
+    silhouette e Calinski–Harabasz per ogni k.
+
+    La matrice delle distanze viene calcolata una volta e condivisa dai
+    processi (joblib la passa come memmap), invece di essere ricalcolata da
+    silhouette_score per ogni k. Occupa n² float64: per molte migliaia di
+    partecipanti conviene un campione.
+
+    Parameters
+    ----------
+    X : array-like (n, d)
+        Matrice delle feature, già scalata.
+    k_values : iterable of int
+        Valori di k da confrontare (quelli >= n vengono ignorati).
+    n_jobs : int, opzionale
+        Processi da usare; di default uno per k, fino al numero di core.
+    """
+    X = np.asarray(X, dtype=float)
+    k_validi = [k for k in k_values if 2 <= k < len(X)]
+    if not k_validi:
+        return pd.DataFrame(columns=["k", "Inerzia", "Silhouette", "Calinski-Harabasz"])
+    D = pairwise_distances(X)
+    if n_jobs is None:
+        n_jobs = max(1, min(len(k_validi), os.cpu_count() or 1))
+    righe = Parallel(n_jobs=n_jobs, backend="loky")(
+        delayed(_valuta_k)(X, D, k, random_state) for k in k_validi
+    )
+    return pd.DataFrame(righe)
@@ -0,0 +1,42 @@
+import os
+import streamlit as st
+import sqlalchemy
+from lib.get_secret import get_secret
+from lib.schema import ensure_schema
+
+# Questo modulo centralizza la connessione a Google Cloud SQL:
+# un solo engine (e quindi un solo pool di connessioni) per URL e per processo.
+
+POOL_SIZE = int(os.getenv("SQL_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("SQL_MAX_OVERFLOW", "5"))
+POOL_TIMEOUT = int(os.getenv("SQL_POOL_TIMEOUT", "30"))
+# Cloud SQL chiude le connessioni inattive: le ricicliamo prima
+POOL_RECYCLE = int(os.getenv("SQL_POOL_RECYCLE", "1800"))
+
+
+@st.cache_resource(show_spinner=False)
+def _create_engine(db_url: str):
+    if db_url.startswith("sqlite"):
+        engine = sqlalchemy.create_engine(db_url, pool_pre_ping=True)
+    else:
+        engine = sqlalchemy.create_engine(
+            db_url,
+            pool_size=POOL_SIZE,
+            max_overflow=MAX_OVERFLOW,
+            pool_timeout=POOL_TIMEOUT,
+            pool_recycle=POOL_RECYCLE,
+            pool_pre_ping=True,
+        )
+    # Schema e migrazioni una sola volta, alla creazione dell'engine
+    ensure_schema(engine)
+    return engine
+
+
+def get_engine(db_url: str = None):
+    """
+    Restituisce l'engine SQLAlchemy condiviso per l'URL indicato
+    (di default il segreto SQL_CONNECTION_URL).
+    """
+    if db_url is None:
+        db_url = get_secret("SQL_CONNECTION_URL")
+    return _create_engine(db_url)
@@ -0,0 +1,166 @@
+import os
+import re
+import json
+import time
+import tempfile
+import threading
+from datetime import datetime, timezone
+from gspread.utils import numericise
+
+# Backend finto dei fogli Google, su disco, per benchmark e test di carico
+# senza credenziali. Implementa il sottoinsieme dell'API gspread usato
+# dall'app (Spreadsheet.worksheet, Worksheet.get_all_records, get_all_values,
+# append_row, append_rows, col_values, batch_get, batch_update).
+# Ogni chiamata attende FAKE_SHEETS_LATENCY_MS millisecondi per simulare
+# il round-trip verso l'API.
+#
+# Si attiva con SHEETS_BACKEND=fake (vedi lib.google_sheet). Ogni file è un
+# JSON in FAKE_SHEETS_DIR: {"nome foglio": [[intestazione...], [riga...], ...]}
+
+FAKE_DIR = os.getenv("FAKE_SHEETS_DIR", os.path.join(tempfile.gettempdir(), "fake_sheets"))
+LATENCY_MS = float(os.getenv("FAKE_SHEETS_LATENCY_MS", "0"))
+
+_LOCK = threading.Lock()
+_SPREADSHEETS = {}
+
+
+def _round_trip():
+    if LATENCY_MS > 0:
+        time.sleep(LATENCY_MS / 1000)
+
+
+def _col_index(letters):
+    index = 0
+    for ch in letters:
+        index = index * 26 + (ord(ch) - ord("A") + 1)
+    return index
+
+
+def _parse_range(a1):
+    # "A2:ZZ", "1:1", "B2:D", "A5:H5" -> (riga1, col1, riga2, col2), None = aperto
+    match = re.fullmatch(r"([A-Z]*)(\d*):([A-Z]*)(\d*)", a1.split("!")[-1].upper())
+    if match is None:
+        raise ValueError(f"Intervallo non supportato: {a1}")
+    c1, r1, c2, r2 = match.groups()
+    return (
+        int(r1) if r1 else 1,
+        _col_index(c1) if c1 else 1,
+        int(r2) if r2 else None,
+        _col_index(c2) if c2 else None,
+    )
+
+
+class FakeWorksheet:
+    def __init__(self, spreadsheet, title):
+        self.spreadsheet = spreadsheet
+        self.title = title
+
+    @property
+    def _rows(self):
+        return self.spreadsheet._data.setdefault(self.title, [])
+
+    def get_all_values(self):
+        _round_trip()
+        with self.spreadsheet._lock:
+            return [list(r) for r in self._rows]
+
+    def get_all_records(self):
+        values = self.get_all_values()
+        if not values:
+            return []
+        header = values[0]
+        return [
+            dict(zip(header, [numericise(v) for v in row + [""] * (len(header) - len(row))]))
+            for row in values[1:]
+        ]
+
+    def col_values(self, col):
+        _round_trip()
+        with self.spreadsheet._lock:
+            return [r[col - 1] for r in self._rows if len(r) >= col and r[col - 1] != ""]
+
+    def _get_range(self, a1):
+        r1, c1, r2, c2 = _parse_range(a1)
+        rows = self._rows[r1 - 1:r2]
+        return [[str(v) for v in r[c1 - 1:c2]] for r in rows]
+
+    def get(self, a1):
+        _round_trip()
+        with self.spreadsheet._lock:
+            return self._get_range(a1)
+
+    def batch_get(self, ranges):
+        _round_trip()
+        with self.spreadsheet._lock:
+            return [self._get_range(a1) for a1 in ranges]
+
+    def append_row(self, values):
+        self.append_rows([values])
+
+    def append_rows(self, rows):
+        _round_trip()
+        with self.spreadsheet._lock:
+            self._rows.extend([str(v) for v in row] for row in rows)
+            self.spreadsheet._save()
+
+    def batch_update(self, data):
+        _round_trip()
+        with self.spreadsheet._lock:
+            for item in data:
+                r1, c1, _, _ = _parse_range(item["range"])
+                for offset, values in enumerate(item["values"]):
+                    while len(self._rows) < r1 + offset:
+                        self._rows.append([])
+                    row = self._rows[r1 - 1 + offset]
+                    row.extend([""] * (c1 - 1 + len(values) - len(row)))
+                    row[c1 - 1:c1 - 1 + len(values)] = [str(v) for v in values]
+            self.spreadsheet._save()
+
+
+class FakeSpreadsheet:
+    def __init__(self, title):
+        self.title = title
+        self._lock = threading.RLock()
+        self._path = os.path.join(FAKE_DIR, f"{title}.json")
+        self._data = {}
+        self.lastUpdateTime = None
+        if os.path.exists(self._path):
+            with open(self._path, encoding="utf-8") as f:
+                self._data = json.load(f)
+            self.lastUpdateTime = datetime.fromtimestamp(
+                os.path.getmtime(self._path), tz=timezone.utc
+            ).isoformat()
+
+    def _save(self):
+        os.makedirs(FAKE_DIR, exist_ok=True)
+        with open(self._path, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, ensure_ascii=False)
+        self.lastUpdateTime = datetime.now(timezone.utc).isoformat()
+
+    def worksheet(self, title):
+        _round_trip()
+        with self._lock:
+            if title not in self._data:
+                raise KeyError(f"Foglio '{title}' non trovato in '{self.title}'")
+        return FakeWorksheet(self, title)
+
+
+def open_spreadsheet(sheet_name):
+    """
+    Equivalente di client.open() per il backend finto.
+    """
+    _round_trip()
+    with _LOCK:
+        if sheet_name not in _SPREADSHEETS:
+            _SPREADSHEETS[sheet_name] = FakeSpreadsheet(sheet_name)
+        return _SPREADSHEETS[sheet_name]
+
+
+def seed_worksheet(sheet_name, worksheet_name, rows):
+    """
+    Sostituisce il contenuto di un foglio finto (intestazione inclusa).
+    """
+    spreadsheet = open_spreadsheet(sheet_name)
+    with spreadsheet._lock:
+        spreadsheet._data[worksheet_name] = [[str(v) for v in row] for row in rows]
+        spreadsheet._save()
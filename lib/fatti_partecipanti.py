@@ -0,0 +1,158 @@
+import threading
+import pandas as pd
+import streamlit as st
+
+# Tabella dei fatti per partecipante, materializzata e condivisa dal processo.
+#
+# Una riga per partecipante: pesi AHP (ultima risposta del foglio
+# 'Pesi Parametri') uniti agli attributi del profilo ('Partecipanti').
+# I fogli sono in sola aggiunta, quindi a ogni aggiornamento si leggono solo
+# le righe nuove e si ricalcolano solo i partecipanti toccati, senza rifare
+# il merge sull'intero storico. Le colonne testuali ripetitive sono
+# categoriche e le posizioni per tavola rotonda sono precalcolate.
+#
+# La chiave è l'ID partecipante ('ID Partecipante' ↔ 'id'); per i fogli
+# senza ID si ricade sul nome ('Utente' ↔ 'Nome').
+
+CHIAVI = [("ID Partecipante", "id"), ("Utente", "Nome")]
+TAVOLA = "Tavola rotonda"
+INDICE = "ID Partecipante"
+
+# Colonne testuali con al massimo tanti valori distinti diventano categoriche
+MAX_CATEGORIE = 50
+
+
+def _chiave(serie: pd.Series) -> pd.Series:
+    # ID numerici (es. 123 e 123.0 dopo valori mancanti) devono coincidere
+    if pd.api.types.is_numeric_dtype(serie):
+        serie = serie.astype("Int64")
+    return serie.astype(str).str.strip().replace({"nan": "", "None": "", "<NA>": ""})
+
+
+def _per_chiave(df: pd.DataFrame, colonna: str) -> pd.DataFrame:
+    # Ultima riga per chiave, indicizzata per chiave; chiavi vuote scartate
+    chiavi = _chiave(df[colonna])
+    df = df.drop(columns=[colonna]).set_index(chiavi.rename(INDICE))
+    df = df[df.index != ""]
+    return df[~df.index.duplicated(keep="last")]
+
+
+def _categoriche(df: pd.DataFrame) -> pd.DataFrame:
+    for col in df.columns:
+        if df[col].dtype == object or isinstance(df[col].dtype, pd.CategoricalDtype):
+            valori = df[col].astype(object)
+            if col == TAVOLA or valori.nunique(dropna=True) <= MAX_CATEGORIE:
+                df[col] = valori.astype("category")
+    return df
+
+
+class TabellaFattiPartecipanti:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._chiavi = None
+        self._colonne = None
+        self._righe_pesi = 0
+        self._righe_profili = 0
+        self._pesi = pd.DataFrame()
+        self._profili = pd.DataFrame()
+        self._fatti = pd.DataFrame()
+        self._per_tavola = {}
+
+    @staticmethod
+    def _scegli_chiavi(df_pesi, df_profili):
+        for chiave_pesi, chiave_profili in CHIAVI:
+            if chiave_pesi in df_pesi.columns and chiave_profili in df_profili.columns:
+                return chiave_pesi, chiave_profili
+        raise KeyError("Nessuna colonna comune per unire pesi AHP e profili dei partecipanti.")
+
+    def aggiorna(self, df_pesi: pd.DataFrame, df_profili: pd.DataFrame):
+        """
+        Aggiunge le righe nuove dei due fogli e ricalcola solo i partecipanti toccati.
+        Se i fogli si accorciano o cambiano colonne la tabella viene ricostruita.
+        """
+        chiavi = self._scegli_chiavi(df_pesi, df_profili)
+        colonne = (tuple(df_pesi.columns), tuple(df_profili.columns))
+        with self._lock:
+            if (
+                chiavi != self._chiavi
+                or colonne != self._colonne
+                or len(df_pesi) < self._righe_pesi
+                or len(df_profili) < self._righe_profili
+            ):
+                self._reset()
+                self._chiavi, self._colonne = chiavi, colonne
+
+            nuovi_pesi = _per_chiave(df_pesi.iloc[self._righe_pesi:], chiavi[0])
+            nuovi_profili = _per_chiave(df_profili.iloc[self._righe_profili:], chiavi[1])
+            self._righe_pesi, self._righe_profili = len(df_pesi), len(df_profili)
+            if nuovi_pesi.empty and nuovi_profili.empty:
+                return
+
+            self._pesi = pd.concat([self._pesi.drop(index=nuovi_pesi.index, errors="ignore"), nuovi_pesi])
+            self._profili = pd.concat(
+                [self._profili.drop(index=nuovi_profili.index, errors="ignore"), nuovi_profili]
+            )
+
+            # Join solo per i partecipanti toccati; per le colonne presenti in
+            # entrambi i fogli (es. 'Tavola rotonda') vale il valore dei pesi AHP
+            toccati = nuovi_pesi.index.union(nuovi_profili.index)
+            pesi = self._pesi[self._pesi.index.isin(toccati)]
+            profili = self._profili[self._profili.index.isin(pesi.index)]
+            profili = profili.drop(columns=[c for c in profili.columns if c in pesi.columns])
+            nuovi_fatti = pesi.join(profili, how="inner")
+
+            fatti = self._fatti.drop(index=toccati, errors="ignore")
+            fatti = nuovi_fatti if fatti.empty else pd.concat([fatti, nuovi_fatti])
+            fatti = _categoriche(fatti)
+            self._fatti = fatti
+            self._per_tavola = (
+                fatti.groupby(TAVOLA, observed=True).indices if TAVOLA in fatti.columns else {}
+            )
+
+    def fatti(self) -> pd.DataFrame:
+        """
+        Tabella dei fatti corrente, indicizzata per ID partecipante.
+        Il DataFrame è condiviso: usare assign/copy invece di modificarlo.
+        """
+        with self._lock:
+            return self._fatti
+
+    def tavole(self) -> list:
+        with self._lock:
+            return sorted(self._per_tavola)
+
+    def righe_tavola(self, tavola, maschera: pd.Series = None) -> pd.DataFrame:
+        """
+        Partecipanti di una tavola rotonda, tramite le posizioni precalcolate.
+
+        Parameters
+        ----------
+        tavola : str
+            Valore di 'Tavola rotonda'.
+        maschera : pd.Series of bool, opzionale
+            Filtro per ID partecipante (es. risposte coerenti); gli ID assenti
+            dalla maschera sono esclusi.
+        """
+        with self._lock:
+            righe = self._fatti.iloc[self._per_tavola.get(tavola, [])]
+        if maschera is not None:
+            righe = righe[maschera.reindex(righe.index, fill_value=False).to_numpy(dtype=bool)]
+        return righe
+
+    def per_tavola(self, maschera: pd.Series = None) -> dict:
+        """
+        Tavola rotonda -> partecipanti (vedi righe_tavola), senza tavole vuote.
+        """
+        gruppi = {tavola: self.righe_tavola(tavola, maschera) for tavola in self.tavole()}
+        return {tavola: righe for tavola, righe in gruppi.items() if not righe.empty}
+
+
+@st.cache_resource(show_spinner=False)
+def get_tabella_fatti() -> TabellaFattiPartecipanti:
+    """
+    Tabella dei fatti condivisa dal processo.
+    """
+    return TabellaFattiPartecipanti()
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+from lib.impronta import cache_per_impronta
+
+# Feature condivise dei partecipanti per le pagine 2, 4 e 99.
+#
+# Dal foglio 'Partecipanti' si ricavano, una volta per versione dei dati:
+# - la tabella pulita e tipizzata (nomi di colonna e testi senza spazi,
+#   stringhe vuote come mancanti, colonne numeriche come numeri);
+# - la matrice numerica standardizzata (z-score su tutti i partecipanti,
+#   così le tavole rotonde restano confrontabili);
+# - i codici delle colonne categoriche con vocabolari stabili (ordinati).
+# I blocchi multi-hot delle scelte multiple (lib.multiscelta) si ottengono
+# con blocchi_multihot, separatamente, per non caricare scipy all'apertura.
+
+COLONNE_NUMERICHE = ("Età", "Coinvolgimento", "Conoscenza tema")
+
+# Colonne di servizio escluse dalle feature categoriche
+COLONNE_ESCLUSE = ("timestamp", "id", "Nome")
+
+
+def _pulisci(df: pd.DataFrame) -> pd.DataFrame:
+    dati = df.copy()
+    dati.columns = [str(c).strip() for c in dati.columns]
+    for col in dati.columns:
+        if dati[col].dtype == object:
+            testo = dati[col].map(lambda v: v.strip() if isinstance(v, str) else v)
+            dati[col] = testo.replace("", np.nan)
+    for col in COLONNE_NUMERICHE:
+        if col in dati.columns:
+            dati[col] = pd.to_numeric(dati[col], errors="coerce")
+    return dati
+
+
+def _standardizza(numeriche: pd.DataFrame) -> pd.DataFrame:
+    # Come StandardScaler (deviazione standard di popolazione); i mancanti restano NaN
+    media = numeriche.mean()
+    deviazione = numeriche.std(ddof=0).replace(0, 1)
+    return (numeriche - media) / deviazione
+
+
+@cache_per_impronta(max_entries=8)
+def _feature(df):
+    dati = _pulisci(df)
+    numeriche = dati[[c for c in COLONNE_NUMERICHE if c in dati.columns]]
+    categoriche = [
+        c for c in dati.columns
+        if c not in COLONNE_ESCLUSE and c not in COLONNE_NUMERICHE and not pd.api.types.is_numeric_dtype(dati[c])
+    ]
+    vocabolari = {c: sorted(dati[c].dropna().astype(str).unique()) for c in categoriche}
+    codici = pd.DataFrame(
+        {
+            c: pd.Categorical(dati[c].astype("string"), categories=vocabolari[c]).codes.astype(np.int32)
+            for c in categoriche
+        },
+        index=dati.index,
+    )
+    return {
+        "dati": dati,
+        "numeriche": numeriche,
+        "scalate": _standardizza(numeriche),
+        "codici": codici,
+        "vocabolari": vocabolari,
+    }
+
+
+def feature_partecipanti(df: pd.DataFrame, impronta=None) -> dict:
+    """
+    Feature dei partecipanti, in cache per versione dei dati.
+    Se l'impronta di df è già stata calcolata la si può passare.
+
+    Returns
+    -------
+    dict
+        'dati': tabella pulita e tipizzata (stesso indice di df);
+        'numeriche': colonne numeriche del profilo;
+        'scalate': le stesse standardizzate (z-score);
+        'codici': codici interi delle colonne categoriche (-1 = mancante);
+        'vocabolari': colonna -> categorie ordinate, nell'ordine dei codici.
+    """
+    return _feature(df, impronta=impronta)
+
+
+def blocchi_multihot(df: pd.DataFrame) -> dict:
+    """
+    Blocchi multi-hot delle colonne a scelta multipla (vedi lib.multiscelta).
+    """
+    from lib.multiscelta import codifica_colonne
+    return codifica_colonne(df)
@@ -1,33 +1,122 @@
 import os
 import json
+import threading
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
 import streamlit as st
 
-def get_gspread_client():
+# Backend dei fogli: "gspread" (Google, default) oppure "fake"
+# (lib.fake_sheets, su disco e senza credenziali, per benchmark).
+SHEETS_BACKEND = os.getenv("SHEETS_BACKEND", "gspread")
+
+# Registro di processo degli handle già aperti: evita di ripetere
+# client.open() e spreadsheet.worksheet() a ogni rerun delle pagine.
+_REGISTRY_LOCK = threading.Lock()
+_SPREADSHEETS = {}
+_WORKSHEETS = {}
+_OPEN_LOCKS = {}
+
+
+def _load_service_account_info():
+    # Lettura delle credenziali: Streamlit Cloud o Cloud Run
+    if "gcp_service_account" in st.secrets:
+        return dict(st.secrets["gcp_service_account"])
+    if "GCP_CREDENTIALS_JSON" in os.environ:
+        return json.loads(os.environ["GCP_CREDENTIALS_JSON"])
+    return None
+
+
+@st.cache_resource(show_spinner=False)
+def _authorized_client():
     scope = [
         "https://spreadsheets.google.com/feeds",
         "https://www.googleapis.com/auth/drive"
     ]
+    service_account_info = _load_service_account_info()
+    if service_account_info is None:
+        raise RuntimeError("Credenziali Google non trovate.")
+    credentials = ServiceAccountCredentials.from_json_keyfile_dict(service_account_info, scope)
+    return gspread.authorize(credentials)
 
-    # Lettura delle credenziali: Streamlit Cloud o Cloud Run
-    if "gcp_service_account" in st.secrets:
-        service_account_info = st.secrets["gcp_service_account"]
-    elif "GCP_CREDENTIALS_JSON" in os.environ:
-        service_account_info = json.loads(os.environ["GCP_CREDENTIALS_JSON"])
-    else:
+
+def _refresh_if_expired(client):
+    # Con oauth2client il token scade dopo un'ora: lo rinnoviamo sul client
+    # condiviso invece di ricreare client e handle.
+    credentials = getattr(client, "auth", None)
+    if getattr(credentials, "access_token_expired", False) and hasattr(client, "login"):
+        client.login()
+
+
+def get_gspread_client():
+    """
+    Restituisce il client gspread condiviso da tutto il processo.
+    L'autenticazione avviene una sola volta; il token viene rinnovato quando scade.
+    """
+    try:
+        client = _authorized_client()
+    except RuntimeError:
         st.error("❌ Credenziali Google non trovate.")
         st.stop()
+    with _REGISTRY_LOCK:
+        _refresh_if_expired(client)
+    return client
 
-    credentials = ServiceAccountCredentials.from_json_keyfile_dict(service_account_info, scope)
-    return gspread.authorize(credentials)
+
+def reset_gspread_cache():
+    """
+    Svuota client e handle in cache (es. dopo un errore di autenticazione).
+    """
+    with _REGISTRY_LOCK:
+        _SPREADSHEETS.clear()
+        _WORKSHEETS.clear()
+    _authorized_client.clear()
+
+
+def _open_spreadsheet(sheet_name):
+    if SHEETS_BACKEND == "fake":
+        from lib.fake_sheets import open_spreadsheet
+        return open_spreadsheet(sheet_name)
+    client = _authorized_client()
+    with _REGISTRY_LOCK:
+        _refresh_if_expired(client)
+    return client.open(sheet_name)
+
+
+def get_worksheet(sheet_name, worksheet_name="Sheet1"):
+    """
+    Come get_sheet_by_name ma solleva l'eccezione invece di mostrarla:
+    utilizzabile anche da thread in background senza contesto Streamlit.
+    """
+    key = (sheet_name, worksheet_name)
+    with _REGISTRY_LOCK:
+        worksheet = _WORKSHEETS.get(key)
+    if worksheet is not None:
+        if SHEETS_BACKEND != "fake":
+            client = _authorized_client()
+            with _REGISTRY_LOCK:
+                _refresh_if_expired(client)
+        return worksheet
+
+    with _REGISTRY_LOCK:
+        open_lock = _OPEN_LOCKS.setdefault(sheet_name, threading.Lock())
+    # Un solo client.open() per file anche con più thread in parallelo
+    with open_lock:
+        spreadsheet = _SPREADSHEETS.get(sheet_name)
+        if spreadsheet is None:
+            spreadsheet = _open_spreadsheet(sheet_name)
+            with _REGISTRY_LOCK:
+                _SPREADSHEETS[sheet_name] = spreadsheet
+    worksheet = spreadsheet.worksheet(worksheet_name)
+    with _REGISTRY_LOCK:
+        worksheet = _WORKSHEETS.setdefault(key, worksheet)
+    return worksheet
 
 
 def get_sheet_by_name(sheet_name, worksheet_name="Sheet1"):
-    client = get_gspread_client()
+    if SHEETS_BACKEND != "fake":
+        get_gspread_client()
     try:
-        spreadsheet = client.open(sheet_name)
-        return spreadsheet.worksheet(worksheet_name)
+        return get_worksheet(sheet_name, worksheet_name)
     except Exception as e:
         st.error(f"❌ Errore nel caricamento del foglio '{worksheet_name}': {e}")
         return None
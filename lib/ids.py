@@ -0,0 +1,32 @@
+import time
+import string
+import secrets
+
+# Identificativi partecipante generati senza leggere il foglio 'Partecipanti'.
+# Formato (16 caratteri base62): 7 caratteri di timestamp in millisecondi,
+# così gli ID sono ordinabili nel tempo, seguiti da 9 caratteri casuali
+# crittograficamente sicuri. Due ID coincidono solo se generati nello stesso
+# millisecondo con la stessa parte casuale (62^9 ≈ 1.3e16 combinazioni):
+# una probabilità trascurabile che non richiede il controllo dei duplicati.
+
+# Ordine ASCII (cifre, maiuscole, minuscole): l'ordinamento lessicografico
+# degli ID coincide con quello temporale
+ALFABETO = string.digits + string.ascii_uppercase + string.ascii_lowercase
+TIMESTAMP_LEN = 7
+
+
+def _base62(numero: int, lunghezza: int) -> str:
+    cifre = []
+    for _ in range(lunghezza):
+        numero, resto = divmod(numero, len(ALFABETO))
+        cifre.append(ALFABETO[resto])
+    return "".join(reversed(cifre))
+
+
+def genera_id_partecipante(lunghezza: int = 16) -> str:
+    """
+    Genera un ID univoco ordinato nel tempo in tempo costante.
+    """
+    timestamp = _base62(time.time_ns() // 1_000_000, TIMESTAMP_LEN)
+    casuale = "".join(secrets.choice(ALFABETO) for _ in range(lunghezza - TIMESTAMP_LEN))
+    return timestamp + casuale
@@ -0,0 +1,47 @@
+import hashlib
+import functools
+import pandas as pd
+import streamlit as st
+
+# Impronta del contenuto dei dati e cache dei risultati derivati.
+#
+# Le funzioni di analisi ricevono DataFrame costosi da hashare a ogni rerun:
+# cache_per_impronta le mette in st.cache_data usando come chiave l'impronta
+# dei dati (calcolata una volta, o passata dal chiamante) e i parametri,
+# mentre i dati stessi non vengono hashati.
+
+
+def dataframe_fingerprint(df):
+    """
+    Impronta del contenuto di un DataFrame o di una Series (valori, indice e
+    colonne), da usare come chiave di cache per risultati derivati dai dati.
+    """
+    valori = pd.util.hash_pandas_object(df, index=True).values
+    colonne = df.columns if isinstance(df, pd.DataFrame) else [df.name]
+    colonne = "\x1f".join(map(str, colonne))
+    return hashlib.sha1(valori.tobytes() + colonne.encode("utf-8")).hexdigest()
+
+
+def cache_per_impronta(max_entries=None):
+    """
+    Decoratore per funzioni calcolo(dati, *parametri): il risultato è in
+    cache (st.cache_data) per impronta di dati e valore dei parametri.
+    La funzione decorata accetta impronta=... per riusare un'impronta già
+    calcolata sugli stessi dati.
+    """
+    def decoratore(funzione):
+        def _in_cache(impronta, _dati, parametri):
+            return funzione(_dati, *parametri)
+
+        # Chiave di cache distinta per ogni funzione decorata
+        _in_cache.__module__ = funzione.__module__
+        _in_cache.__qualname__ = funzione.__qualname__
+        _in_cache = st.cache_data(show_spinner=False, max_entries=max_entries)(_in_cache)
+
+        @functools.wraps(funzione)
+        def calcolo(dati, *parametri, impronta=None):
+            return _in_cache(impronta or dataframe_fingerprint(dati), dati, parametri)
+
+        calcolo.clear = _in_cache.clear
+        return calcolo
+    return decoratore
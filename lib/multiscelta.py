@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from lib.impronta import cache_per_impronta
+
+# Codifica multi-hot delle risposte a scelta multipla (es. 'Valori').
+#
+# Le risposte sono salvate come testo separato da ", " (vedi pagina 1).
+# Ogni colonna viene codificata una volta per versione dei dati in una
+# matrice sparsa booleana (partecipanti × valori) con un vocabolario
+# ordinato e condiviso: frequenze, Pareto e confronti per gruppo diventano
+# somme sulla matrice invece di split/explode sulle stringhe.
+
+SEPARATORE = ", "
+
+# Colonne a scelta multipla del foglio 'Partecipanti'. Le domande
+# 'multiselect' del form dinamico (pagina 1) sono salvate solo su SQL,
+# nella tabella Risposte in formato lungo, e non compaiono nel foglio.
+COLONNE_MULTISCELTA = ("Valori",)
+
+
+def _tokenizza(testo, separatore):
+    if testo is None or (isinstance(testo, float) and np.isnan(testo)):
+        return []
+    return [t.strip() for t in str(testo).split(separatore.strip()) if t.strip()]
+
+
+@cache_per_impronta(max_entries=32)
+def _codifica(valori, separatore):
+    righe = [_tokenizza(v, separatore) for v in valori]
+    vocabolario = sorted({t for r in righe for t in r})
+    posizione = {t: j for j, t in enumerate(vocabolario)}
+    indptr = np.cumsum([0] + [len(set(r)) for r in righe])
+    indici = [posizione[t] for r in righe for t in dict.fromkeys(r)]
+    matrice = sparse.csr_matrix(
+        (np.ones(len(indici), dtype=bool), np.asarray(indici, dtype=np.int32), indptr),
+        shape=(len(righe), len(vocabolario)),
+    )
+    return matrice, vocabolario
+
+
+class MultiHot:
+    """
+    Matrice multi-hot (sparsa) di una colonna, allineata all'indice del DataFrame.
+    """
+
+    def __init__(self, matrice, vocabolario, indice, nome):
+        self.matrice = matrice
+        self.vocabolario = list(vocabolario)
+        self.indice = indice
+        self.nome = nome
+
+    def righe(self, etichette) -> "MultiHot":
+        """
+        Sottoinsieme di righe (etichette dell'indice), con lo stesso vocabolario.
+        """
+        posizioni = self.indice.get_indexer(pd.Index(etichette))
+        posizioni = posizioni[posizioni >= 0]
+        return MultiHot(self.matrice[posizioni], self.vocabolario, self.indice[posizioni], self.nome)
+
+    def frequenze(self) -> pd.Series:
+        """
+        Numero di partecipanti per valore, in ordine decrescente.
+        """
+        conteggi = np.asarray(self.matrice.sum(axis=0)).ravel()
+        serie = pd.Series(conteggi, index=pd.Index(self.vocabolario, name=self.nome), name="Frequenza")
+        return serie[serie > 0].sort_values(ascending=False, kind="stable")
+
+    def pareto(self) -> pd.DataFrame:
+        """
+        Frequenze con la percentuale cumulata (colonne Valore, Frequenza, Cumulata %).
+        """
+        frequenze = self.frequenze()
+        tabella = frequenze.rename_axis("Valore").reset_index()
+        tabella["Cumulata %"] = tabella["Frequenza"].cumsum() / tabella["Frequenza"].sum() * 100
+        return tabella
+
+    def per_gruppo(self, gruppi: pd.Series) -> pd.DataFrame:
+        """
+        Frequenze per gruppo come prodotto matrice indicatrice × multi-hot.
+        Restituisce una tabella lunga (gruppo, Valore, Frequenza).
+        """
+        gruppi = gruppi.reindex(self.indice)
+        codici, livelli = pd.factorize(gruppi, sort=True)
+        validi = codici >= 0
+        indicatrice = sparse.csr_matrix(
+            (np.ones(validi.sum()), (codici[validi], np.flatnonzero(validi))),
+            shape=(len(livelli), len(self.indice)),
+        )
+        conteggi = (indicatrice @ self.matrice.astype(np.int64)).toarray()
+        tabella = pd.DataFrame(conteggi, index=pd.Index(livelli, name=gruppi.name), columns=self.vocabolario)
+        tabella = tabella.rename_axis(columns="Valore").stack().rename("Frequenza").reset_index()
+        return tabella[tabella["Frequenza"] > 0].reset_index(drop=True)
+
+    def dataframe(self, prefisso=True) -> pd.DataFrame:
+        """
+        Matrice densa booleana (una colonna per valore), es. per il clustering.
+        """
+        colonne = [f"{self.nome}: {v}" if prefisso else v for v in self.vocabolario]
+        return pd.DataFrame(self.matrice.toarray(), index=self.indice, columns=colonne)
+
+
+def codifica_multiscelta(df: pd.DataFrame, colonna: str, separatore=SEPARATORE) -> MultiHot:
+    """
+    Codifica multi-hot di una colonna a scelta multipla, in cache per versione dei dati.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Tabella completa: il vocabolario è quello di tutte le righe, così
+        i sottoinsiemi (es. per tavola rotonda) restano confrontabili.
+    colonna : str
+        Colonna con le scelte separate da separatore.
+    """
+    matrice, vocabolario = _codifica(df[colonna], separatore)
+    return MultiHot(matrice, vocabolario, df.index, colonna)
+
+
+def codifica_colonne(df: pd.DataFrame, colonne=COLONNE_MULTISCELTA) -> dict:
+    """
+    Codifiche multi-hot delle colonne a scelta multipla presenti in df.
+    """
+    return {col: codifica_multiscelta(df, col) for col in colonne if col in df.columns}
@@ -0,0 +1,128 @@
+import os
+import json
+import logging
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+# Motore di regole per l'assegnazione delle PersonaModel.
+#
+# Le regole sono ordinate: vince la prima soddisfatta, altrimenti si assegna
+# la persona predefinita. Ogni regola è un'etichetta con un elenco di
+# condizioni [colonna, operatore, soglia] in AND. Le regole vengono compilate
+# una volta (per quartiere) in funzioni vettoriali: ogni condizione produce
+# una maschera NumPy sull'intera colonna e l'assegnazione è un unico np.select.
+#
+# Le regole si possono personalizzare per quartiere con un file JSON indicato
+# da PERSONA_RULES_PATH:
+#   {"predefinita": "🌍 ...", "default": [regole...], "Valtesse": [regole...]}
+# Ogni regola: {"etichetta": "🧑‍🎓 ...", "condizioni": [["Età", "<", 30], ...]}
+
+RULES_PATH = os.getenv("PERSONA_RULES_PATH", "")
+
+PERSONA_PREDEFINITA = "🌍 Partecipante coinvolto"
+
+REGOLE_BASE = [
+    {"etichetta": "🧑‍🎓 Giovane attivista", "condizioni": [["Età", "<", 30], ["Coinvolgimento", ">=", 7]]},
+    {"etichetta": "🧑‍🔬 Esperto tecnico", "condizioni": [["Ruolo", "==", "Tecnico/Esperto"], ["Conoscenza tema", ">=", 7]]},
+    {"etichetta": "👤 Cittadino curioso", "condizioni": [["Esperienza", "==", "No"], ["Coinvolgimento", "<", 4]]},
+    {"etichetta": "🏛️ Rappresentante", "condizioni": [["Ruolo", "==", "Rappresentante istituzionale"]]},
+]
+
+OPERATORI = {
+    "<": np.less,
+    "<=": np.less_equal,
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "==": np.equal,
+    "!=": np.not_equal,
+    "in": lambda valori, soglia: np.isin(valori, list(soglia)),
+}
+
+logger = logging.getLogger(__name__)
+
+
+def _leggi_configurazione():
+    if not RULES_PATH or not os.path.exists(RULES_PATH):
+        return {}
+    try:
+        with open(RULES_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Regole PersonaModel non leggibili da '{RULES_PATH}': {e}")
+        return {}
+
+
+def _compila_condizione(colonna, operatore, soglia):
+    if operatore not in OPERATORI:
+        raise ValueError(f"Operatore non supportato nelle regole PersonaModel: {operatore}")
+    funzione = OPERATORI[operatore]
+    numerica = isinstance(soglia, (int, float)) and not isinstance(soglia, bool)
+
+    def maschera(df):
+        if colonna not in df.columns:
+            return np.zeros(len(df), dtype=bool)
+        if numerica:
+            valori = pd.to_numeric(df[colonna], errors="coerce").to_numpy(dtype=float)
+            with np.errstate(invalid="ignore"):
+                # I confronti con NaN sono falsi, come nella versione riga per riga
+                return funzione(valori, soglia) & ~np.isnan(valori)
+        return np.asarray(funzione(df[colonna].astype(str).to_numpy(), soglia), dtype=bool)
+
+    return maschera
+
+
+class RegolePersona:
+    def __init__(self, regole, predefinita=PERSONA_PREDEFINITA):
+        self.etichette = [r["etichetta"] for r in regole]
+        self.predefinita = predefinita
+        self._regole = [
+            [_compila_condizione(*condizione) for condizione in r["condizioni"]] for r in regole
+        ]
+
+    def maschere(self, df: pd.DataFrame) -> list:
+        """
+        Una maschera booleana per regola (AND delle sue condizioni).
+        """
+        maschere = []
+        for condizioni in self._regole:
+            maschera = np.ones(len(df), dtype=bool)
+            for condizione in condizioni:
+                maschera &= condizione(df)
+            maschere.append(maschera)
+        return maschere
+
+    def assegna(self, df: pd.DataFrame) -> pd.Series:
+        """
+        PersonaModel di ogni riga di df (prima regola soddisfatta).
+        """
+        if not self._regole:
+            return pd.Series(self.predefinita, index=df.index, name="PersonaModel")
+        persone = np.select(self.maschere(df), self.etichette, default=self.predefinita)
+        return pd.Series(persone, index=df.index, name="PersonaModel")
+
+
+@lru_cache(maxsize=64)
+def regole_per_quartiere(quartiere=None) -> RegolePersona:
+    """
+    Regole compilate per il quartiere (o quelle di default), in cache.
+    """
+    configurazione = _leggi_configurazione()
+    regole = configurazione.get(quartiere) if quartiere else None
+    if regole is None:
+        regole = configurazione.get("default", REGOLE_BASE)
+    return RegolePersona(regole, configurazione.get("predefinita", PERSONA_PREDEFINITA))
+
+
+def assegna_persona(df: pd.DataFrame, quartiere=None) -> pd.Series:
+    """
+    Assegna la PersonaModel a tutti i partecipanti in modo vettoriale.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Partecipanti (colonne come nel foglio 'Partecipanti').
+    quartiere : str, opzionale
+        Quartiere di cui usare le regole personalizzate, se configurate.
+    """
+    return regole_per_quartiere(quartiere).assegna(df)
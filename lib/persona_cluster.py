@@ -0,0 +1,264 @@
+import os
+import glob
+import time
+import pickle
+import logging
+import threading
+import numpy as np
+import pandas as pd
+from lib.impronta import dataframe_fingerprint
+
+# Clustering KPrototypes dei partecipanti (pagina 99), persistente.
+#
+# Ogni fit è salvato su disco (CACHE_DIR) con l'impronta dei dati: modello,
+# etichette e riepilogo per cluster (moda/media) si riusano tra rerun,
+# sessioni e riavvii. Se rispetto all'ultimo fit sono state solo aggiunte
+# poche righe (al massimo WARM_START_QUOTA), il nuovo fit parte dai centroidi
+# precedenti (una sola inizializzazione) invece che da Huang con n_init
+# ripetizioni. In modalità background il fit gira in un thread e la pagina
+# mostra subito gli ultimi cluster noti, assegnando le righe nuove con il
+# modello precedente.
+
+# I fit sono pickle: la cartella deve essere privata dell'utente dell'app
+CACHE_DIR = os.getenv(
+    "KPROTO_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "persona_model", "kprototypes")
+)
+N_CLUSTERS = 4
+RANDOM_STATE = 42
+WARM_START_QUOTA = float(os.getenv("KPROTO_WARM_START_QUOTA", "0.10"))
+MAX_FILE = 10
+
+STATO_AGGIORNATO = "aggiornato"
+STATO_IN_AGGIORNAMENTO = "in aggiornamento"
+
+logger = logging.getLogger(__name__)
+
+_LOCK = threading.Lock()
+_FIT = {}
+_IN_CORSO = set()
+
+
+def _percorso(impronta):
+    return os.path.join(CACHE_DIR, f"kprototypes_{impronta}.pkl")
+
+
+def _cartella_privata():
+    # Niente pickle da cartelle di altri utenti o scrivibili da gruppo/altri
+    try:
+        stato = os.stat(CACHE_DIR)
+    except FileNotFoundError:
+        return False
+    if stato.st_uid != os.getuid() or stato.st_mode & 0o022:
+        logger.warning(f"Cartella dei fit KPrototypes non privata, ignorata: {CACHE_DIR}")
+        return False
+    return True
+
+
+def _carica(impronta):
+    with _LOCK:
+        if impronta in _FIT:
+            return _FIT[impronta]
+    if not _cartella_privata():
+        return None
+    try:
+        with open(_percorso(impronta), "rb") as f:
+            fit = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Fit KPrototypes non leggibile ({impronta}): {e}")
+        return None
+    with _LOCK:
+        _FIT[impronta] = fit
+    return fit
+
+
+def _ultimo(colonne):
+    # Fit più recente sulle stesse colonne, dalla memoria o dal disco
+    if not _cartella_privata():
+        return None
+    file = sorted(glob.glob(os.path.join(CACHE_DIR, "kprototypes_*.pkl")), key=os.path.getmtime, reverse=True)
+    for path in file:
+        fit = _carica(os.path.basename(path)[len("kprototypes_"):-len(".pkl")])
+        if fit is not None and fit["colonne"] == colonne:
+            return fit
+    return None
+
+
+def _salva(fit):
+    with _LOCK:
+        _FIT[fit["impronta"]] = fit
+        while len(_FIT) > MAX_FILE:
+            _FIT.pop(next(iter(_FIT)))
+    try:
+        os.makedirs(CACHE_DIR, mode=0o700, exist_ok=True)
+        if not _cartella_privata():
+            return
+        temporaneo = _percorso(fit["impronta"]) + ".tmp"
+        with open(temporaneo, "wb") as f:
+            pickle.dump(fit, f)
+        os.replace(temporaneo, _percorso(fit["impronta"]))
+        vecchi = sorted(glob.glob(os.path.join(CACHE_DIR, "kprototypes_*.pkl")), key=os.path.getmtime)
+        for path in vecchi[:-MAX_FILE]:
+            os.remove(path)
+    except OSError as e:
+        logger.warning(f"Impossibile salvare il fit KPrototypes: {e}")
+
+
+def _matrice(df, categoriche, codici):
+    X = df.copy()
+    for col in categoriche:
+        X[col] = codici[col].to_numpy()
+    return X.to_numpy(dtype=float)
+
+
+def _codici(df, categoriche, vocabolari):
+    return pd.DataFrame(
+        {c: pd.Categorical(df[c].astype("string"), categories=vocabolari[c]).codes for c in categoriche},
+        index=df.index,
+    )
+
+
+def riepilogo_cluster(df, etichette) -> pd.DataFrame:
+    """
+    Moda (colonne testuali) o media (numeriche) di ogni colonna per cluster.
+    """
+    return df.assign(Cluster=etichette).groupby("Cluster").agg(
+        lambda x: x.mode()[0] if x.dtype == "object" else x.mean(numeric_only=True)
+    )
+
+
+def _centroidi(modello, n_numeriche):
+    centroidi = modello.cluster_centroids_
+    if isinstance(centroidi, list):
+        return np.asarray(centroidi[0], dtype=float), np.asarray(centroidi[1])
+    return centroidi[:, :n_numeriche].astype(float), centroidi[:, n_numeriche:]
+
+
+def _warm_start(precedente, df, categoriche, vocabolari):
+    # Centroidi del fit precedente se i dati sono lo stesso prefisso più poche righe
+    if precedente is None or precedente["categoriche"] != categoriche:
+        return None
+    n_prec = precedente["n"]
+    nuove = len(df) - n_prec
+    if nuove < 0 or nuove > max(1, WARM_START_QUOTA * n_prec):
+        return None
+    if dataframe_fingerprint(df.iloc[:n_prec]) != precedente["impronta"]:
+        return None
+    numeriche = [c for c in df.columns if c not in categoriche]
+    num, cat = _centroidi(precedente["modello"], len(numeriche))
+    # I codici categorici vengono riportati al vocabolario corrente tramite i valori
+    cat_codici = np.column_stack([
+        pd.Categorical(
+            [precedente["vocabolari"][c][int(k)] for k in cat[:, j]], categories=vocabolari[c]
+        ).codes
+        for j, c in enumerate(categoriche)
+    ])
+    return [num, cat_codici]
+
+
+def _addestra(df, categoriche, codici, vocabolari, impronta, precedente):
+    from kmodes.kprototypes import KPrototypes
+
+    X = _matrice(df, categoriche, codici)
+    indici_cat = [df.columns.get_loc(c) for c in categoriche]
+    init = _warm_start(precedente, df, categoriche, vocabolari)
+    if init is not None:
+        modello = KPrototypes(n_clusters=N_CLUSTERS, init=init, n_init=1, random_state=RANDOM_STATE)
+    else:
+        modello = KPrototypes(n_clusters=N_CLUSTERS, init="Huang", random_state=RANDOM_STATE)
+    inizio = time.perf_counter()
+    etichette = modello.fit_predict(X, categorical=indici_cat)
+    fit = {
+        "impronta": impronta,
+        "colonne": list(df.columns),
+        "categoriche": list(categoriche),
+        "vocabolari": {c: list(vocabolari[c]) for c in categoriche},
+        "n": len(df),
+        "modello": modello,
+        "etichette": np.asarray(etichette),
+        "riepilogo": riepilogo_cluster(df, etichette),
+        "warm_start": init is not None,
+        "secondi": time.perf_counter() - inizio,
+    }
+    _salva(fit)
+    return fit
+
+
+def _addestra_in_background(df, categoriche, codici, vocabolari, impronta, precedente):
+    with _LOCK:
+        if impronta in _IN_CORSO:
+            return
+        _IN_CORSO.add(impronta)
+
+    def _run():
+        try:
+            _addestra(df, categoriche, codici, vocabolari, impronta, precedente)
+        except Exception as e:
+            logger.warning(f"Fit KPrototypes in background fallito: {e}")
+        finally:
+            with _LOCK:
+                _IN_CORSO.discard(impronta)
+
+    threading.Thread(target=_run, name="kprototypes-fit", daemon=True).start()
+
+
+def cluster_partecipanti(df: pd.DataFrame, categoriche, codici: pd.DataFrame, vocabolari: dict,
+                         background: bool = False) -> dict:
+    """
+    Cluster KPrototypes dei partecipanti, dal fit in cache quando possibile.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Righe complete (senza mancanti) con le colonne da usare.
+    categoriche : list of str
+        Colonne categoriche di df.
+    codici : pd.DataFrame
+        Codici delle colonne categoriche, allineati a df
+        (vedi lib.feature_partecipanti).
+    vocabolari : dict
+        Colonna -> categorie, nell'ordine dei codici.
+    background : bool
+        Se esiste un fit precedente, rifà il fit in un thread e restituisce
+        subito i cluster del modello precedente.
+
+    Returns
+    -------
+    dict
+        'etichette' (array allineato a df), 'riepilogo' (moda/media per
+        cluster), 'stato' (aggiornato / in aggiornamento), 'warm_start'.
+    """
+    # Copie: il fit in background non deve vedere modifiche fatte dalla pagina
+    df, codici = df.copy(), codici.copy()
+    categoriche = list(categoriche)
+    impronta = dataframe_fingerprint(df)
+    fit = _carica(impronta)
+    if fit is None:
+        precedente = _ultimo(list(df.columns))
+        etichette = None
+        if background and precedente is not None:
+            # Ultimi cluster noti: le righe (anche nuove) assegnate dal modello precedente
+            try:
+                vecchi_codici = _codici(df, precedente["categoriche"], precedente["vocabolari"])
+                X = _matrice(df, precedente["categoriche"], vecchi_codici)
+                indici_cat = [df.columns.get_loc(c) for c in precedente["categoriche"]]
+                etichette = np.asarray(precedente["modello"].predict(X, categorical=indici_cat))
+            except Exception as e:
+                logger.warning(f"Modello KPrototypes precedente non applicabile: {e}")
+        if etichette is not None:
+            _addestra_in_background(df, categoriche, codici, vocabolari, impronta, precedente)
+            return {
+                "etichette": etichette,
+                "riepilogo": riepilogo_cluster(df, etichette),
+                "stato": STATO_IN_AGGIORNAMENTO,
+                "warm_start": False,
+            }
+        fit = _addestra(df, categoriche, codici, vocabolari, impronta, precedente)
+    return {
+        "etichette": fit["etichette"],
+        "riepilogo": fit["riepilogo"],
+        "stato": STATO_AGGIORNATO,
+        "warm_start": fit["warm_start"],
+    }
+
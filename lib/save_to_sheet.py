@@ -1,8 +1,39 @@
 import streamlit as st
-from lib.google_sheet import get_sheet_by_name
+from gspread.utils import rowcol_to_a1
+from lib.google_sheet import get_worksheet
+from lib.sheet_cache import invalidate_sheet
+from lib.sheet_mirror import mark_stale, request_full_resync
+from lib.write_queue import enqueue_row, get_status, worksheet_lock, STATO_SALVATO, STATO_ERRORE
 
 # Questo modulo centralizza tutte le interazioni con Google Sheet
 
+SESSION_TICKETS_KEY = "salvataggi_in_coda"
+
+
+def save_rows_to_sheet(righe: list, sheet_name: str = "Partecipanti"):
+    """
+    Accoda più righe per il salvataggio su Google Sheet e ritorna subito.
+    La scrittura avviene in background (vedi lib.write_queue); i ticket restano
+    in sessione e mostra_stato_salvataggi() ne riporta l'esito.
+
+    Parameters
+    ----------
+    righe : list[dict]
+        Dizionari di valori, uno per riga da appendere.
+    sheet_name : str
+        Nome del foglio all'interno del file 'Dati_Partecipante'.
+    """
+    try:
+        tickets = [enqueue_row("Dati_Partecipante", sheet_name, list(dati.values())) for dati in righe]
+        st.session_state.setdefault(SESSION_TICKETS_KEY, []).extend(tickets)
+        st.success("✅ Dati inviati, salvataggio su Google Sheet in corso.")
+        return tickets
+    except Exception as e:
+        st.error("❌ Errore nel salvataggio su Google Sheet.")
+        st.text(f"Dettaglio: {e}")
+        return []
+
+
 def save_to_sheet(dati: dict, sheet_name: str = "Partecipanti"):
     """
     Salva i dati su Google Sheet.
@@ -14,10 +45,91 @@ def save_to_sheet(dati: dict, sheet_name: str = "Partecipanti"):
     sheet_name : str
         Nome del foglio all'interno del file 'Dati_Partecipante'.
     """
+    tickets = save_rows_to_sheet([dati], sheet_name)
+    return tickets[0] if tickets else None
+
+
+def _col_letter(col: int) -> str:
+    return rowcol_to_a1(1, col).rstrip("0123456789")
+
+
+def upsert_rows_to_sheet(righe: list, sheet_name: str, key_columns: list):
+    """
+    Scrive più righe in un'unica operazione idempotente: le righe la cui chiave
+    esiste già nel foglio vengono aggiornate, le altre appese in fondo.
+    Il costo è costante (una lettura delle sole colonne chiave, un batch_update
+    e un append_rows) indipendentemente dal numero di righe.
+
+    Parameters
+    ----------
+    righe : list[dict]
+        Dizionari di valori con le stesse chiavi, nell'ordine delle colonne.
+    sheet_name : str
+        Nome del foglio all'interno del file 'Dati_Partecipante'.
+    key_columns : list[str]
+        Colonne che identificano univocamente una riga.
+    """
+    if not righe:
+        return True
     try:
-        sheet = get_sheet_by_name("Dati_Partecipante", sheet_name)
-        sheet.append_row(list(dati.values()))
-        st.success("✅ Dati salvati su Google Sheet!")
+        columns = list(righe[0].keys())
+        key_idx = [columns.index(c) + 1 for c in key_columns]
+        first, last = min(key_idx), max(key_idx)
+        key_range = f"{_col_letter(first)}2:{_col_letter(last)}"
+
+        with worksheet_lock("Dati_Partecipante", sheet_name):
+            sheet = get_worksheet("Dati_Partecipante", sheet_name)
+            existing = sheet.batch_get([key_range])[0]
+            positions = {}
+            for offset, values in enumerate(existing):
+                values = list(values) + [""] * (last - first + 1 - len(values))
+                positions[tuple(str(values[i - first]) for i in key_idx)] = offset + 2
+
+            updates, new_rows = [], []
+            for dati in righe:
+                values = list(dati.values())
+                row = positions.get(tuple(str(dati[c]) for c in key_columns))
+                if row is None:
+                    new_rows.append(values)
+                else:
+                    updates.append({"range": f"A{row}:{rowcol_to_a1(row, len(values))}", "values": [values]})
+            if updates:
+                sheet.batch_update(updates)
+            if new_rows:
+                sheet.append_rows(new_rows)
+
+        invalidate_sheet("Dati_Partecipante", sheet_name)
+        if updates:
+            request_full_resync(sheet_name)
+        else:
+            mark_stale(sheet_name)
+        st.success(f"✅ Dati salvati su Google Sheet ({len(updates)} aggiornati, {len(new_rows)} nuovi)!")
+        return True
     except Exception as e:
         st.error("❌ Errore nel salvataggio su Google Sheet.")
         st.text(f"Dettaglio: {e}")
+        return False
+
+
+def mostra_stato_salvataggi():
+    """
+    Mostra l'esito dei salvataggi in coda della sessione corrente
+    e rimuove dalla sessione quelli conclusi.
+    """
+    tickets = st.session_state.get(SESSION_TICKETS_KEY, [])
+    in_corso = []
+    salvati = 0
+    for ticket in tickets:
+        status = get_status(ticket)
+        if status["stato"] == STATO_SALVATO:
+            salvati += 1
+        elif status["stato"] == STATO_ERRORE:
+            st.error("❌ Errore nel salvataggio su Google Sheet.")
+            st.text(f"Dettaglio: {status['dettaglio']}")
+        else:
+            in_corso.append(ticket)
+    if salvati:
+        st.toast(f"✅ {salvati} righe salvate su Google Sheet!")
+    if in_corso:
+        st.info(f"⏳ Salvataggio in corso ({len(in_corso)} righe in coda)...")
+    st.session_state[SESSION_TICKETS_KEY] = in_corso
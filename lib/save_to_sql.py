@@ -1,6 +1,7 @@
+import time
 import streamlit as st
-import sqlalchemy
 from sqlalchemy import text
+from lib.db import get_engine
 
 # Questo modulo centralizza tutte le interazioni con Google Cloud SQL
 
@@ -18,21 +19,14 @@ def save_to_sql(dati: dict, table_name: str = "Risposte"):
             - 'answers': dict question->response
     table_name : str
         Tabella in cui salvare le risposte.
+
+    Returns
+    -------
+    dict | None
+        'righe' inserite e 'secondi' impiegati, None in caso di errore.
     """
     try:
-        db_url = st.secrets.get("SQL_CONNECTION_URL", "")
-        engine = sqlalchemy.create_engine(db_url)
-        # Crea la tabella se non esiste
-        create_sql = text(f"""
-            CREATE TABLE IF NOT EXISTS {table_name} (
-                timestamp  VARCHAR(20),
-                id         VARCHAR(50),
-                quartiere  VARCHAR(100),
-                question   TEXT,
-                response   TEXT
-            )
-        """
-        )
+        engine = get_engine()
         insert_sql = text(f"""
             INSERT INTO {table_name} (timestamp, id, quartiere, question, response)
             VALUES (:timestamp, :id, :quartiere, :question, :response)
@@ -40,18 +34,25 @@ def save_to_sql(dati: dict, table_name: str = "Risposte"):
         )
         ts = dati.get("timestamp")
         answers = dati.get("answers", {})
+        # Tutte le risposte in un'unica lista di parametri: executemany
+        params = [
+            {
+                "timestamp": ts,
+                "id": dati.get("id"),
+                "quartiere": dati.get("quartiere"),
+                "question": question,
+                "response": ", ".join(map(str, response)) if isinstance(response, list) else str(response)
+            }
+            for question, response in answers.items()
+        ]
+        start = time.perf_counter()
         with engine.begin() as conn:
-            conn.execute(create_sql)
-            for question, response in answers.items():
-                resp = ", ".join(map(str, response)) if isinstance(response, list) else str(response)
-                conn.execute(insert_sql, {
-                    "timestamp": ts,
-                    "id": dati.get("id"),
-                    "quartiere": dati.get("quartiere"),
-                    "question": question,
-                    "response": resp
-                })
-        st.success("✅ Risposte salvate su Cloud SQL!")
+            if params:
+                conn.execute(insert_sql, params)
+        esito = {"righe": len(params), "secondi": time.perf_counter() - start}
+        st.success(f"✅ {esito['righe']} risposte salvate su Cloud SQL in {esito['secondi']:.2f} s!")
+        return esito
     except Exception as e:
         st.error("❌ Errore nel salvataggio su Cloud SQL.")
         st.text(f"Dettaglio: {e}")
+        return None
@@ -0,0 +1,118 @@
+import logging
+from sqlalchemy import text, inspect
+
+# Schema del database Cloud SQL, applicato una sola volta per processo
+# alla creazione dell'engine (vedi lib.db). I percorsi delle richieste
+# eseguono quindi solo DML.
+#
+# Ogni migrazione ha un numero di versione crescente; la tabella
+# schema_version registra quelle già applicate. Per modificare lo schema
+# aggiungere una nuova voce in fondo a MIGRATIONS, senza toccare le precedenti.
+# Una migrazione è una lista di istruzioni SQL o di funzioni (conn) -> None.
+# Su MySQL il DDL viene confermato subito: ogni passo deve poter essere
+# rieseguito dopo una migrazione interrotta (IF NOT EXISTS, _indice).
+
+logger = logging.getLogger(__name__)
+
+
+def _text_index(dialect: str) -> str:
+    # MySQL richiede una lunghezza di prefisso per indicizzare colonne TEXT
+    return "(191)" if dialect == "mysql" else ""
+
+
+def _indice(nome: str, tabella: str, colonna: str, testo: bool = False):
+    # CREATE INDEX solo se l'indice non esiste (MySQL non supporta IF NOT EXISTS)
+    def crea(conn):
+        esistenti = {i["name"] for i in inspect(conn).get_indexes(tabella)}
+        if nome not in esistenti:
+            prefisso = _text_index(conn.dialect.name) if testo else ""
+            conn.execute(text(f"CREATE INDEX {nome} ON {tabella} ({colonna}{prefisso})"))
+    return crea
+
+
+MIGRATIONS = [
+    (1, lambda dialect: [
+        """
+        CREATE TABLE IF NOT EXISTS Risposte (
+            timestamp  VARCHAR(20),
+            id         VARCHAR(50),
+            quartiere  VARCHAR(100),
+            question   TEXT,
+            response   TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS Questions (
+            quartiere       VARCHAR(100),
+            question        TEXT,
+            question_type   VARCHAR(50),
+            question_value  TEXT
+        )
+        """,
+    ]),
+    (2, lambda dialect: [
+        _indice("ix_risposte_quartiere", "Risposte", "quartiere"),
+        _indice("ix_risposte_id", "Risposte", "id"),
+        _indice("ix_risposte_question", "Risposte", "question", testo=True),
+        _indice("ix_questions_quartiere", "Questions", "quartiere"),
+    ]),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def _current_version(conn) -> int:
+    return conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar() or 0
+
+
+def _chiave_schema_version(engine):
+    # Tabelle create prima della PRIMARY KEY: ricostruite una volta, senza duplicati
+    if inspect(engine).get_pk_constraint("schema_version")["constrained_columns"]:
+        return
+    try:
+        with engine.begin() as conn:
+            # Resto di una ricostruzione interrotta (su MySQL il DDL non si annulla)
+            conn.execute(text("DROP TABLE IF EXISTS schema_version_pk"))
+            conn.execute(text("CREATE TABLE schema_version_pk (version INTEGER NOT NULL PRIMARY KEY)"))
+            conn.execute(text("INSERT INTO schema_version_pk SELECT DISTINCT version FROM schema_version"))
+            conn.execute(text("DROP TABLE schema_version"))
+            conn.execute(text("ALTER TABLE schema_version_pk RENAME TO schema_version"))
+    except Exception:
+        # Un'altra istanza potrebbe aver già ricostruito la tabella
+        if not inspect(engine).get_pk_constraint("schema_version")["constrained_columns"]:
+            logger.exception("Impossibile aggiungere la chiave primaria a schema_version")
+            raise
+
+
+def ensure_schema(engine):
+    """
+    Crea tabelle e indici mancanti applicando le migrazioni non ancora eseguite.
+    Restituisce la versione dello schema.
+    """
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL PRIMARY KEY)"))
+    _chiave_schema_version(engine)
+    with engine.connect() as conn:
+        version = _current_version(conn)
+
+    dialect = engine.dialect.name
+    for target, statements in MIGRATIONS:
+        if target <= version:
+            continue
+        try:
+            with engine.begin() as conn:
+                for passo in statements(dialect):
+                    if callable(passo):
+                        passo(conn)
+                    else:
+                        conn.execute(text(passo))
+                conn.execute(text("INSERT INTO schema_version (version) VALUES (:v)"), {"v": target})
+        except Exception:
+            # Un'altra istanza potrebbe aver applicato la stessa migrazione
+            with engine.connect() as conn:
+                if _current_version(conn) < target:
+                    logger.exception(f"Migrazione dello schema alla versione {target} fallita")
+                    raise
+        version = target
+        logger.info(f"Schema database alla versione {version}")
+    return version
@@ -0,0 +1,120 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from lib.google_sheet import get_worksheet
+
+# Cache condivisa (per processo, quindi tra tutte le sessioni) delle letture
+# dei fogli Google. Ogni voce è uno snapshot DataFrame con la revisione del
+# foglio al momento del download: scaduto il TTL si controlla prima la
+# revisione e si riscarica il foglio solo se è cambiato.
+
+DEFAULT_TTL = int(os.getenv("SHEET_CACHE_TTL", "60"))
+
+_LOCK = threading.Lock()
+_KEY_LOCKS = {}
+_SNAPSHOTS = {}
+
+
+def _key_lock(key):
+    with _LOCK:
+        return _KEY_LOCKS.setdefault(key, threading.Lock())
+
+
+def sheet_revision(worksheet):
+    # Data di ultima modifica del file (una chiamata leggera all'API Drive);
+    # in mancanza, il numero di righe occupate nella prima colonna.
+    try:
+        getter = getattr(worksheet.spreadsheet, "get_lastUpdateTime", None)
+        return getter() if getter else worksheet.spreadsheet.lastUpdateTime
+    except Exception:
+        return len(worksheet.col_values(1))
+
+
+def read_sheet_df(sheet_name, worksheet_name, ttl=DEFAULT_TTL):
+    """
+    Restituisce il contenuto del foglio come DataFrame, usando lo snapshot
+    condiviso se ancora valido. Solleva l'eccezione in caso di errore.
+
+    Parameters
+    ----------
+    sheet_name : str
+        Nome del file Google Sheet (es. 'Dati_Partecipante').
+    worksheet_name : str
+        Nome del foglio di lavoro.
+    ttl : int
+        Secondi dopo i quali si verifica se il foglio è cambiato.
+    """
+    key = (sheet_name, worksheet_name)
+    with _key_lock(key):
+        snapshot = _SNAPSHOTS.get(key)
+        now = time.monotonic()
+        if snapshot and now - snapshot["checked_at"] < ttl:
+            return snapshot["df"].copy()
+
+        worksheet = get_worksheet(sheet_name, worksheet_name)
+        revision = sheet_revision(worksheet)
+        if snapshot and snapshot["revision"] == revision:
+            snapshot["checked_at"] = now
+            return snapshot["df"].copy()
+
+        df = pd.DataFrame(worksheet.get_all_records())
+        _SNAPSHOTS[key] = {
+            "df": df,
+            "revision": revision,
+            "checked_at": now,
+        }
+        return df.copy()
+
+
+def read_sheets_parallel(sheet_name, worksheets, max_workers=4, ttl=DEFAULT_TTL, reader=None):
+    """
+    Legge più fogli dello stesso file in parallelo con un pool di thread limitato.
+    A freddo il tempo totale si avvicina a quello del foglio più lento.
+
+    Parameters
+    ----------
+    sheet_name : str
+        Nome del file Google Sheet.
+    worksheets : dict
+        Mappa chiave -> nome del foglio di lavoro.
+    max_workers : int
+        Numero massimo di letture contemporanee.
+    reader : callable, opzionale
+        Funzione nome_foglio -> DataFrame da usare al posto di read_sheet_df
+        (es. lib.sheet_mirror.read_mirror_df).
+
+    Returns
+    -------
+    tuple(dict, dict)
+        DataFrame per chiave e secondi impiegati per chiave.
+    """
+    def _timed_read(worksheet_name):
+        start = time.perf_counter()
+        if reader is None:
+            df = read_sheet_df(sheet_name, worksheet_name, ttl=ttl)
+        else:
+            df = reader(worksheet_name)
+        return df, time.perf_counter() - start
+
+    workers = max(1, min(max_workers, len(worksheets)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sheet-read") as pool:
+        futures = {key: pool.submit(_timed_read, ws) for key, ws in worksheets.items()}
+        results = {key: future.result() for key, future in futures.items()}
+    dfs = {key: df for key, (df, _) in results.items()}
+    timings = {key: elapsed for key, (_, elapsed) in results.items()}
+    return dfs, timings
+
+
+def invalidate_sheet(sheet_name, worksheet_name=None):
+    """
+    Forza il ricontrollo del foglio alla prossima lettura.
+    Da chiamare dopo ogni scrittura fatta dall'app.
+    Se worksheet_name è None invalida tutti i fogli del file.
+    """
+    with _LOCK:
+        for key, snapshot in _SNAPSHOTS.items():
+            if key[0] == sheet_name and worksheet_name in (None, key[1]):
+                snapshot["checked_at"] = float("-inf")
+                snapshot["revision"] = None
@@ -0,0 +1,245 @@
+import os
+import re
+import time
+import sqlite3
+import logging
+import threading
+import pandas as pd
+import streamlit as st
+from gspread.utils import numericise
+from lib.google_sheet import get_worksheet
+from lib.sheet_cache import sheet_revision
+
+# Copia locale (SQLite) dei fogli del file 'Dati_Partecipante'.
+# Le pagine di analisi leggono dalla copia, quindi la latenza non dipende
+# dall'API di Google. La sincronizzazione è incrementale: si scaricano solo
+# le righe aggiunte dopo l'ultima sincronizzazione (i fogli sono in append).
+# Con le righe si salva la revisione del file (lastUpdateTime): se è cambiata
+# ma non ci sono righe nuove, qualcosa è stato modificato sul posto (anche da
+# un'altra istanza o prima di un riavvio) e il foglio viene riscaricato per
+# intero, come quando cambia l'intestazione o dopo request_full_resync.
+# La revisione è del file, non del foglio: una scrittura su un altro foglio
+# costa al più un riscaricamento completo.
+
+SPREADSHEET = "Dati_Partecipante"
+MIRROR_PATH = os.getenv(
+    "MIRROR_DB_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "persona_model", "dati_partecipante.sqlite"),
+)
+SYNC_INTERVAL = int(os.getenv("MIRROR_SYNC_SECONDS", "30"))
+
+logger = logging.getLogger(__name__)
+
+_LOCK = threading.Lock()
+_SYNC_LOCKS = {}
+_LAST_SYNC = {}
+_FULL_RESYNC = set()
+
+
+def _connect():
+    # Cartella privata dell'utente dell'app, come i fit di lib.persona_cluster
+    os.makedirs(os.path.dirname(MIRROR_PATH) or ".", mode=0o700, exist_ok=True)
+    conn = sqlite3.connect(MIRROR_PATH, timeout=30)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS _sync_state ("
+        " worksheet TEXT PRIMARY KEY, header TEXT, rows INTEGER, synced_at REAL, revision TEXT)"
+    )
+    colonne = [r[1] for r in conn.execute("PRAGMA table_info(_sync_state)")]
+    if "revision" not in colonne:
+        # Copie create prima della revisione: la prima sincronizzazione è completa
+        conn.execute("ALTER TABLE _sync_state ADD COLUMN revision TEXT")
+    return conn
+
+
+def _table_name(worksheet_name):
+    return "ws_" + re.sub(r"\W+", "_", worksheet_name.lower()).strip("_")
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _unique_header(header):
+    seen = {}
+    result = []
+    for col in header:
+        col = str(col).strip() or "colonna"
+        seen[col] = seen.get(col, 0) + 1
+        result.append(col if seen[col] == 1 else f"{col}_{seen[col]}")
+    return result
+
+
+def _sync_lock(worksheet_name):
+    with _LOCK:
+        return _SYNC_LOCKS.setdefault(worksheet_name, threading.Lock())
+
+
+def mark_stale(worksheet_name):
+    """
+    Segnala che al foglio sono state aggiunte righe: la prossima lettura
+    avvia subito una sincronizzazione incrementale.
+    """
+    with _LOCK:
+        _LAST_SYNC.pop(worksheet_name, None)
+
+
+def request_full_resync(worksheet_name):
+    """
+    Segnala che righe esistenti del foglio sono state modificate:
+    la prossima sincronizzazione lo riscarica per intero.
+    """
+    with _LOCK:
+        _FULL_RESYNC.add(worksheet_name)
+        _LAST_SYNC.pop(worksheet_name, None)
+
+
+def sync_worksheet(worksheet_name):
+    """
+    Sincronizza il foglio nella copia locale scaricando solo le righe nuove.
+    Restituisce il numero di righe aggiunte.
+    """
+    with _sync_lock(worksheet_name):
+        conn = _connect()
+        try:
+            state = conn.execute(
+                "SELECT header, rows, revision FROM _sync_state WHERE worksheet = ?", (worksheet_name,)
+            ).fetchone()
+            with _LOCK:
+                full = worksheet_name in _FULL_RESYNC
+            # Stato senza revisione (copia creata da una versione precedente): da zero
+            synced_rows = 0 if state is None or full or state[2] is None else state[1]
+
+            worksheet = get_worksheet(SPREADSHEET, worksheet_name)
+            revision = str(sheet_revision(worksheet))
+            if synced_rows and revision == state[2]:
+                # File invariato: niente da scaricare
+                with _LOCK:
+                    _LAST_SYNC[worksheet_name] = time.monotonic()
+                return 0
+
+            # Intestazione e righe nuove in un'unica chiamata
+            header_values, new_values = worksheet.batch_get(["1:1", f"A{synced_rows + 2}:ZZ"])
+            header = _unique_header(header_values[0] if header_values else [])
+            header_key = "\x1f".join(header)
+            if synced_rows and (state[0] != header_key or not new_values):
+                # Colonne cambiate, o file modificato senza righe nuove
+                # (righe riscritte o cancellate): si riparte da zero
+                synced_rows = 0
+                new_values = worksheet.batch_get(["A2:ZZ"])[0]
+
+            table = _table_name(worksheet_name)
+            rows = [
+                [numericise(v) if v != "" else None for v in (list(r) + [""] * len(header))[:len(header)]]
+                for r in new_values
+            ]
+            # Transazione esplicita: sqlite3 non include il DDL nelle transazioni
+            # implicite. Il riscaricamento completo crea la nuova tabella con un
+            # nome temporaneo e la sostituisce con un RENAME nello stesso COMMIT,
+            # così chi legge vede sempre la versione precedente o quella nuova.
+            conn.isolation_level = None
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if synced_rows == 0:
+                    target = table + "__nuova"
+                    conn.execute(f"DROP TABLE IF EXISTS {_quote(target)}")
+                else:
+                    target = table
+                if not header:
+                    rows = []
+                elif synced_rows == 0:
+                    columns = ", ".join(_quote(c) for c in header)
+                    # Colonne senza tipo: SQLite conserva il tipo di ogni valore
+                    conn.execute(f"CREATE TABLE {_quote(target)} ({columns})")
+                if rows:
+                    placeholders = ", ".join("?" for _ in header)
+                    conn.executemany(f"INSERT INTO {_quote(target)} VALUES ({placeholders})", rows)
+                if synced_rows == 0:
+                    conn.execute(f"DROP TABLE IF EXISTS {_quote(table)}")
+                    if header:
+                        conn.execute(f"ALTER TABLE {_quote(target)} RENAME TO {_quote(table)}")
+                conn.execute(
+                    "INSERT OR REPLACE INTO _sync_state (worksheet, header, rows, synced_at, revision)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (worksheet_name, header_key, synced_rows + len(rows), time.time(), revision),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            with _LOCK:
+                _FULL_RESYNC.discard(worksheet_name)
+                _LAST_SYNC[worksheet_name] = time.monotonic()
+            return len(rows)
+        finally:
+            conn.close()
+
+
+def _sync_in_background(worksheet_name):
+    def _run():
+        try:
+            sync_worksheet(worksheet_name)
+        except Exception as e:
+            logger.warning(f"Sincronizzazione di '{worksheet_name}' fallita: {e}")
+
+    threading.Thread(target=_run, name=f"mirror-{worksheet_name}", daemon=True).start()
+
+
+def _typed(df):
+    # Colonne interamente numeriche (a parte i vuoti) diventano numeriche
+    for col in df.columns:
+        if df[col].dtype == object:
+            converted = pd.to_numeric(df[col], errors="coerce")
+            if converted.notna().sum() == df[col].notna().sum():
+                df[col] = converted
+    return df
+
+
+def read_mirror_df(worksheet_name, max_age=SYNC_INTERVAL):
+    """
+    Legge il foglio dalla copia locale con colonne tipizzate.
+    Alla prima lettura la sincronizzazione è sincrona; in seguito, se la copia
+    è più vecchia di max_age secondi, viene aggiornata in background e si
+    restituisce subito l'ultima versione disponibile.
+    """
+    with _LOCK:
+        last_sync = _LAST_SYNC.get(worksheet_name)
+    conn = _connect()
+    try:
+        synced = conn.execute(
+            "SELECT 1 FROM _sync_state WHERE worksheet = ?", (worksheet_name,)
+        ).fetchone()
+    finally:
+        conn.close()
+
+    with _LOCK:
+        full = worksheet_name in _FULL_RESYNC
+    if synced is None or full:
+        sync_worksheet(worksheet_name)
+    elif last_sync is None or time.monotonic() - last_sync > max_age:
+        with _LOCK:
+            _LAST_SYNC[worksheet_name] = time.monotonic()
+        _sync_in_background(worksheet_name)
+
+    conn = _connect()
+    try:
+        table = _table_name(worksheet_name)
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone()
+        if exists is None:
+            return pd.DataFrame()
+        df = pd.read_sql_query(f"SELECT * FROM {_quote(table)}", conn)
+    finally:
+        conn.close()
+    return _typed(df)
+
+
+def load_mirror_df(worksheet_name):
+    """
+    Variante di read_mirror_df per le pagine: mostra l'errore e restituisce None.
+    """
+    try:
+        return read_mirror_df(worksheet_name)
+    except Exception as e:
+        st.error(f"❌ Errore nel caricamento del foglio '{worksheet_name}': {e}")
+        return None
@@ -1,56 +1,51 @@
+import os
+import threading
 import streamlit as st
-import sqlalchemy
 from sqlalchemy import text
-from lib.get_secret import get_secret
+from lib.db import get_engine
 
 # Questo modulo si attiva solo se SECRET_METHOD è "Google Secret Manager"
-# Serve a creare la tabella delle domande e a recuperarle dinamicamente.
+# Serve a recuperare dinamicamente le domande (la tabella è creata da lib.schema).
+#
+# Le domande di ogni quartiere vengono compilate in una specifica del form
+# (tipo di widget, opzioni già separate, estremi degli slider) tenuta in
+# cache e condivisa tra le sessioni. Chi modifica la tabella Questions deve
+# chiamare invalidate_form_spec(quartiere).
+
+FORM_CACHE_TTL = int(os.getenv("FORM_CACHE_TTL", "600"))
+
+_VERSIONS_LOCK = threading.Lock()
+_FORM_VERSIONS = {}
+
+
+def _sql_attivo():
+    return st.session_state.get("secret_method", "Streamlit Secrets") == "Google Secret Manager"
+
 
 def _get_engine():
-    secret_method = st.session_state.get("secret_method", "Streamlit Secrets")
-    if secret_method != "Google Secret Manager":
+    if not _sql_attivo():
         return None
-    # Recupera URL di connessione da segreti
-    db_url = get_secret("SQL_CONNECTION_URL")
-    engine = sqlalchemy.create_engine(db_url)
-    return engine
+    # Engine condiviso (URL di connessione da segreti)
+    return get_engine()
 
 
-def ensure_questions_table():
-    """
-    Crea la tabella 'Questions' se non esiste.
-    Struttura:
-      - quartiere:    VARCHAR(100)
-      - question:     TEXT
-      - question_type VARCHAR(50)   # e.g. 'select', 'radio', 'text', 'multiselect', 'slider'
-      - question_value TEXT         # valori possibili, separati da virgola
-    """
-    engine = _get_engine()
-    if engine is None:
-        return
-    create_sql = text(
-        """
-        CREATE TABLE IF NOT EXISTS Questions (
-            quartiere       VARCHAR(100),
-            question        TEXT,
-            question_type   VARCHAR(50),
-            question_value  TEXT
-        )
-        """
-    )
-    with engine.begin() as conn:
-        conn.execute(create_sql)
+def _compile_question(question, qtype, qvals):
+    values = [v.strip() for v in qvals.split(',')] if qvals else []
+    spec = {
+        "question": question,
+        "type": qtype,
+        "values": values
+    }
+    if qtype == "slider":
+        numbers = [int(v) for v in values if v.lstrip("-").isdigit()]
+        if numbers:
+            spec["min"] = min(numbers)
+            spec["max"] = max(numbers)
+            spec["default"] = (spec["min"] + spec["max"]) // 2
+    return spec
 
 
-def fetch_questions_for_quartiere(quartiere: str):
-    """
-    Restituisce lista di domande per il quartiere dato.
-    Ogni elemento è un dict con chiavi: question, type, values (lista).
-    """
-    engine = _get_engine()
-    if engine is None:
-        return []
-    ensure_questions_table()
+def _query_questions(engine, quartiere: str):
     query = text(
         "SELECT question, question_type, question_value"
         " FROM Questions"
@@ -58,12 +53,47 @@ def fetch_questions_for_quartiere(quartiere: str):
     )
     with engine.connect() as conn:
         rows = conn.execute(query, {"quartiere": quartiere}).fetchall()
-    questions = []
-    for q, qtype, qvals in rows:
-        values = [v.strip() for v in qvals.split(',')] if qvals else []
-        questions.append({
-            "question": q,
-            "type": qtype,
-            "values": values
-        })
-    return questions
+    return [_compile_question(q, qtype, qvals) for q, qtype, qvals in rows]
+
+
+def fetch_questions_for_quartiere(quartiere: str):
+    """
+    Restituisce lista di domande per il quartiere dato, leggendo dal database.
+    Ogni elemento è un dict con chiavi: question, type, values (lista)
+    e, per gli slider, min, max e default.
+    """
+    engine = _get_engine()
+    if engine is None:
+        return []
+    return _query_questions(engine, quartiere)
+
+
+@st.cache_data(ttl=FORM_CACHE_TTL, show_spinner=False)
+def _load_form_spec(quartiere: str, version: int):
+    # version fa parte della chiave di cache: incrementarla invalida il quartiere.
+    # L'engine (e quindi il segreto) si risolve solo quando la cache manca.
+    return _query_questions(get_engine(), quartiere)
+
+
+def get_form_spec(quartiere: str):
+    """
+    Come fetch_questions_for_quartiere, ma dalla cache condivisa:
+    nel caso comune l'apertura del form non interroga il database.
+    """
+    if not _sql_attivo():
+        return []
+    with _VERSIONS_LOCK:
+        version = _FORM_VERSIONS.get(quartiere, 0)
+    return _load_form_spec(quartiere, version)
+
+
+def invalidate_form_spec(quartiere: str = None):
+    """
+    Da chiamare dopo ogni modifica alla tabella Questions.
+    Senza quartiere svuota la cache di tutti i quartieri.
+    """
+    if quartiere is None:
+        _load_form_spec.clear()
+        return
+    with _VERSIONS_LOCK:
+        _FORM_VERSIONS[quartiere] = _FORM_VERSIONS.get(quartiere, 0) + 1
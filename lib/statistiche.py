@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+from scipy.stats import f_oneway, kruskal, shapiro
+from lib.impronta import cache_per_impronta
+
+# Statistiche di confronto tra gruppi in un unico passaggio.
+#
+# La tabella viene raggruppata una sola volta; dagli stessi array per gruppo
+# si ricavano normalità (Shapiro-Wilk), ANOVA, Kruskal-Wallis e il test
+# post-hoc (Tukey HSD se i gruppi sono normali, Dunn altrimenti).
+# I risultati sono in cache per versione dei dati (impronta del contenuto).
+
+ALPHA = 0.05
+MIN_GRUPPO = 2      # osservazioni minime perché un gruppo entri nei test
+MIN_NORMALITA = 3   # osservazioni minime per Shapiro-Wilk
+POSTHOC = ("auto", "tukey", "dunn", None)
+
+
+def _array_per_gruppo(df, colonna_gruppo, variabili):
+    # Un solo groupby per tutte le variabili: {variabile: {gruppo: array}}
+    arrays = {var: {} for var in variabili}
+    for nome, gruppo in df.groupby(colonna_gruppo, observed=True, sort=True):
+        for var in variabili:
+            arrays[var][nome] = pd.to_numeric(gruppo[var], errors="coerce").dropna().to_numpy(dtype=float)
+    return arrays
+
+
+def _posthoc(test, gruppi):
+    valori = np.concatenate(list(gruppi.values()))
+    etichette = np.concatenate([[str(nome)] * len(v) for nome, v in gruppi.items()])
+    if test == "tukey":
+        from statsmodels.stats.multicomp import pairwise_tukeyhsd
+        tabella = pairwise_tukeyhsd(valori, etichette).summary().data
+        return pd.DataFrame(tabella[1:], columns=tabella[0])
+    import scikit_posthocs as sp
+    dati = pd.DataFrame({"valore": valori, "gruppo": etichette})
+    return sp.posthoc_dunn(dati, val_col="valore", group_col="gruppo", p_adjust="bonferroni")
+
+
+def _test_variabile(var, gruppi, alpha, posthoc):
+    normalita = []
+    for nome, valori in gruppi.items():
+        if len(valori) >= MIN_NORMALITA:
+            w, p = shapiro(valori)
+            normalita.append({"Variabile": var, "Gruppo": nome, "N": len(valori),
+                              "Shapiro-Wilk W": w, "p-value": p, "Normale": p > alpha})
+
+    validi = {nome: v for nome, v in gruppi.items() if len(v) >= MIN_GRUPPO}
+    riga = {"Variabile": var, "Gruppi": len(validi), "F (ANOVA)": np.nan, "p (ANOVA)": np.nan,
+            "Normale": all(r["Normale"] for r in normalita),
+            "H (Kruskal)": np.nan, "p (Kruskal)": np.nan, "Post-hoc": None}
+    tabella_posthoc = None
+    # Valori tutti uguali (es. pesi AHP di default 0.2): kruskal solleva
+    # ValueError e f_oneway darebbe NaN, quindi niente test
+    varia = len(validi) >= 2 and np.ptp(np.concatenate(list(validi.values()))) > 0
+    if varia:
+        anova = f_oneway(*validi.values())
+        kw = kruskal(*validi.values())
+        riga.update({"F (ANOVA)": anova.statistic, "p (ANOVA)": anova.pvalue,
+                     "H (Kruskal)": kw.statistic, "p (Kruskal)": kw.pvalue})
+
+        test = posthoc
+        if posthoc == "auto":
+            test = "tukey" if riga["Normale"] else "dunn"
+        p_test = riga["p (ANOVA)"] if test == "tukey" else riga["p (Kruskal)"]
+        if test is not None and p_test < alpha:
+            riga["Post-hoc"] = "Tukey HSD" if test == "tukey" else "Dunn"
+            tabella_posthoc = _posthoc(test, validi)
+    return riga, normalita, tabella_posthoc
+
+
+@cache_per_impronta(max_entries=32)
+def _statistiche(df, colonna_gruppo, variabili, alpha, posthoc):
+    riepilogo, normalita, posthoc_per_var = [], [], {}
+    for var, gruppi in _array_per_gruppo(df, colonna_gruppo, variabili).items():
+        riga, righe_normalita, tabella = _test_variabile(var, gruppi, alpha, posthoc)
+        riepilogo.append(riga)
+        normalita.extend(righe_normalita)
+        if tabella is not None:
+            posthoc_per_var[var] = tabella
+    return {
+        "riepilogo": pd.DataFrame(riepilogo),
+        "normalita": pd.DataFrame(normalita, columns=["Variabile", "Gruppo", "N", "Shapiro-Wilk W", "p-value", "Normale"]),
+        "posthoc": posthoc_per_var,
+    }
+
+
+def statistiche_per_gruppo(df: pd.DataFrame, colonna_gruppo: str, variabili, alpha=ALPHA, posthoc="auto") -> dict:
+    """
+    Confronto tra gruppi per più variabili in un unico passaggio.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Tabella dei dati.
+    colonna_gruppo : str
+        Colonna che definisce i gruppi (es. 'Tavola rotonda').
+    variabili : list of str
+        Variabili numeriche da confrontare.
+    alpha : float
+        Livello di significatività.
+    posthoc : str or None
+        'auto' (Tukey se normale, Dunn altrimenti), 'tukey', 'dunn' o None.
+
+    Returns
+    -------
+    dict
+        'riepilogo': una riga per variabile (ANOVA, normalità, Kruskal-Wallis,
+        post-hoc eseguito); 'normalita': una riga per variabile e gruppo
+        (Shapiro-Wilk); 'posthoc': variabile -> tabella del test post-hoc.
+    """
+    if posthoc not in POSTHOC:
+        raise ValueError(f"Test post-hoc non supportato: {posthoc}")
+    variabili = tuple(variabili)
+    dati = df[[colonna_gruppo, *variabili]]
+    return _statistiche(dati, colonna_gruppo, variabili, alpha, posthoc)
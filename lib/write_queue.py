@@ -0,0 +1,147 @@
+import os
+import time
+import uuid
+import atexit
+import logging
+import threading
+from lib.google_sheet import get_worksheet
+from lib.sheet_cache import invalidate_sheet
+from lib.sheet_mirror import mark_stale
+
+# Coda di scrittura "write-behind" condivisa dal processo.
+# Le righe inviate dalle pagine vengono accodate per foglio e scritte da un
+# thread in background con un'unica append_rows per foglio, quando la coda
+# raggiunge FLUSH_SIZE righe o sono passati FLUSH_INTERVAL secondi.
+# Ogni riga accodata riceve un ticket con cui la sessione legge l'esito.
+
+FLUSH_SIZE = int(os.getenv("WRITE_QUEUE_BATCH_SIZE", "50"))
+FLUSH_INTERVAL = float(os.getenv("WRITE_QUEUE_FLUSH_SECONDS", "2"))
+MAX_RETRIES = 3
+STATUS_TTL = 3600
+
+STATO_IN_CODA = "in coda"
+STATO_SALVATO = "salvato"
+STATO_ERRORE = "errore"
+
+logger = logging.getLogger(__name__)
+
+_COND = threading.Condition()
+_PENDING = {}
+_STATUS = {}
+_WORKSHEET_LOCKS = {}
+_worker = None
+
+
+def worksheet_lock(sheet_name, worksheet_name):
+    """
+    Lock di processo che serializza le scritture sullo stesso foglio.
+    """
+    with _COND:
+        return _WORKSHEET_LOCKS.setdefault((sheet_name, worksheet_name), threading.Lock())
+
+
+def _ensure_worker():
+    global _worker
+    if _worker is None or not _worker.is_alive():
+        _worker = threading.Thread(target=_worker_loop, name="sheet-write-queue", daemon=True)
+        _worker.start()
+
+
+def _prune_status(now):
+    expired = [t for t, s in _STATUS.items()
+               if s["stato"] != STATO_IN_CODA and now - s["aggiornato"] > STATUS_TTL]
+    for ticket in expired:
+        del _STATUS[ticket]
+
+
+def enqueue_row(sheet_name, worksheet_name, values):
+    """
+    Accoda una riga da appendere al foglio e restituisce il ticket.
+
+    Parameters
+    ----------
+    sheet_name : str
+        Nome del file Google Sheet.
+    worksheet_name : str
+        Nome del foglio di lavoro.
+    values : list
+        Valori della riga, nell'ordine delle colonne.
+    """
+    ticket = uuid.uuid4().hex
+    now = time.time()
+    with _COND:
+        _prune_status(now)
+        _STATUS[ticket] = {"stato": STATO_IN_CODA, "dettaglio": "", "aggiornato": now}
+        queue = _PENDING.setdefault((sheet_name, worksheet_name), [])
+        queue.append((ticket, list(values)))
+        _ensure_worker()
+        if len(queue) >= FLUSH_SIZE:
+            _COND.notify_all()
+    return ticket
+
+
+def get_status(ticket):
+    """
+    Esito di una riga accodata: dict con 'stato' (in coda / salvato / errore)
+    e 'dettaglio' con l'eventuale messaggio di errore.
+    """
+    with _COND:
+        status = _STATUS.get(ticket)
+        if status is None:
+            return {"stato": STATO_ERRORE, "dettaglio": "Ticket sconosciuto o scaduto."}
+        return dict(status)
+
+
+def _set_status(tickets, stato, dettaglio=""):
+    now = time.time()
+    with _COND:
+        for ticket in tickets:
+            _STATUS[ticket] = {"stato": stato, "dettaglio": dettaglio, "aggiornato": now}
+
+
+def _write_batch(key, batch):
+    sheet_name, worksheet_name = key
+    tickets = [ticket for ticket, _ in batch]
+    rows = [values for _, values in batch]
+    for attempt in range(1, MAX_RETRIES + 1):
+        try:
+            with worksheet_lock(sheet_name, worksheet_name):
+                get_worksheet(sheet_name, worksheet_name).append_rows(rows)
+            _set_status(tickets, STATO_SALVATO)
+            invalidate_sheet(sheet_name, worksheet_name)
+            mark_stale(worksheet_name)
+            return
+        except Exception as e:
+            logger.warning(f"Scrittura su '{worksheet_name}' fallita (tentativo {attempt}): {e}")
+            if attempt == MAX_RETRIES:
+                _set_status(tickets, STATO_ERRORE, str(e))
+            else:
+                time.sleep(2 ** attempt)
+
+
+def _take_pending():
+    with _COND:
+        batches = {key: queue for key, queue in _PENDING.items() if queue}
+        _PENDING.clear()
+    return batches
+
+
+def flush():
+    """
+    Scrive subito tutte le righe in coda (bloccante).
+    """
+    for key, batch in _take_pending().items():
+        _write_batch(key, batch)
+
+
+def _worker_loop():
+    while True:
+        with _COND:
+            _COND.wait_for(
+                lambda: any(len(q) >= FLUSH_SIZE for q in _PENDING.values()),
+                timeout=FLUSH_INTERVAL,
+            )
+        flush()
+
+
+atexit.register(flush)
@@ -3,15 +3,12 @@
 import streamlit as st
 import pandas as pd
 import datetime
-import secrets
-import string
-import sqlalchemy
-from sqlalchemy import text
 
-from lib.google_sheet import get_sheet_by_name
+from lib.ids import genera_id_partecipante
+from lib.save_to_sheet import save_to_sheet, mostra_stato_salvataggi
 from lib.style import apply_custom_style
-from lib.get_secret import get_secret
-from lib.sql_questions import fetch_questions_for_quartiere, ensure_questions_table
+from lib.save_to_sql import save_to_sql
+from lib.sql_questions import get_form_spec
 
 
 # ─── Configura pagina ─────────────────────────────────────────────────────
@@ -25,33 +22,22 @@ if not st.session_state.get("logged_in", False):
 # ─── Applica stile grafico ─────────────────────────────────────────────────
 apply_custom_style()
 
+# ─── Esito dei salvataggi in background ────────────────────────────────────
+mostra_stato_salvataggi()
+
 # ─── Eredita quartiere e metodo segreti dal main ──────────────────────────
 quartiere = st.session_state.get("quartiere", "")
 secret_method = st.session_state.get("secret_method", "Streamlit Secrets")
 
 # ─── Genera un ID univoco ───────────────────────────────────────────────────
-def genera_id_univoco(lunghezza=16):
-    chars = string.ascii_letters + string.digits
-    return ''.join(secrets.choice(chars) for _ in range(lunghezza))
-
+# Timestamp + parte casuale: nessuna lettura del foglio 'Partecipanti'
 if "id_partecipante" not in st.session_state:
-    try:
-        sheet = get_sheet_by_name("Dati_Partecipante", "Partecipanti")
-        existing = [r[3] for r in sheet.get_all_values()[1:]]
-        new_id = genera_id_univoco()
-        while new_id in existing:
-            new_id = genera_id_univoco()
-        st.session_state["id_partecipante"] = new_id
-    except Exception as e:
-        st.error("❌ Errore nella generazione dell'ID partecipante.")
-        st.text(f"Dettaglio: {e}")
-        st.stop()
+    st.session_state["id_partecipante"] = genera_id_partecipante()
 
 # ─── Carica domande dinamiche (solo SQL) ────────────────────────────────────
 questions = []
 if secret_method != "Streamlit Secrets":
-    ensure_questions_table()
-    questions = fetch_questions_for_quartiere(quartiere)
+    questions = get_form_spec(quartiere)
 
 # ─── FORM DATI UTENTE ───────────────────────────────────────────────────────
 with st.form("user_info_form"):
@@ -87,10 +73,9 @@ with st.form("user_info_form"):
             elif q["type"] == "multiselect":
                 answers[q["question"]] = st.multiselect(q["question"], q["values"], key=key)
             elif q["type"] == "slider":
-                vals = [int(v) for v in q["values"] if v.isdigit()]
-                if vals:
+                if "min" in q:
                     answers[q["question"]] = st.slider(
-                        q["question"], min(vals), max(vals), (min(vals) + max(vals)) // 2, key=key
+                        q["question"], q["min"], q["max"], q["default"], key=key
                     )
             else:
                 answers[q["question"]] = st.text_input(q["question"], key=key)
@@ -114,42 +99,18 @@ if submitted:
 
         try:
             if secret_method == "Streamlit Secrets":
-                # salva su Google Sheet
-                sheet = get_sheet_by_name("Dati_Partecipante", "Partecipanti")
-                sheet.append_row(list(dati.values()))
-                st.success("✅ Dati salvati su Google Sheet!")
+                # salva su Google Sheet (scrittura in background)
+                save_to_sheet(dati, "Partecipanti")
             else:
-                # salva su Cloud SQL in formato long
-                db_url = get_secret("SQL_CONNECTION_URL")
-                engine = sqlalchemy.create_engine(db_url)
-
-                create_sql = text("""
-                    CREATE TABLE IF NOT EXISTS Risposte (
-                        timestamp  VARCHAR(20),
-                        id         VARCHAR(50),
-                        quartiere  VARCHAR(100),
-                        question   TEXT,
-                        response   TEXT
-                    )
-                """)
-                insert_sql = text("""
-                    INSERT INTO Risposte (timestamp, id, quartiere, question, response)
-                    VALUES (:timestamp, :id, :quartiere, :question, :response)
-                """)
-
-                ts = dati["timestamp"]
-                with engine.begin() as conn:
-                    conn.execute(create_sql)
-                    for question, response in answers.items():
-                        resp = ", ".join(map(str, response)) if isinstance(response, list) else str(response)
-                        conn.execute(insert_sql, {
-                            "timestamp": ts,
-                            "id": dati["id"],
-                            "quartiere": quartiere,
-                            "question": question,
-                            "response": resp
-                        })
-                st.success("✅ Risposte salvate su Cloud SQL!")
+                # salva su Cloud SQL in formato long (un'unica INSERT multipla)
+                esito = save_to_sql({
+                    "timestamp": dati["timestamp"],
+                    "id": dati["id"],
+                    "quartiere": quartiere,
+                    "answers": answers
+                }, "Risposte")
+                if esito is None:
+                    st.stop()
             # vai avanti
             st.query_params = {"page": "2_Persona_Model"}
             st.rerun()
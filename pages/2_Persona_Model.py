@@ -2,17 +2,17 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import plotly.express as px
-import seaborn as sns
-import matplotlib.pyplot as plt
-from sklearn.preprocessing import StandardScaler
-from sklearn.cluster import KMeans
-from sklearn.decomposition import PCA
-from sklearn.metrics import silhouette_score
-from scipy import stats
-import re
-from lib.google_sheet import get_sheet_by_name
+from lib.sheet_mirror import load_mirror_df
+from lib.impronta import dataframe_fingerprint
+from lib.analisi_cache import analisi_memoizzata
+from lib.persona import assegna_persona
+from lib.feature_partecipanti import feature_partecipanti, blocchi_multihot
 from lib.style import apply_custom_style
 
+# Le librerie scientifiche pesanti (scikit-learn, scipy, statsmodels,
+# scikit-posthocs) si importano solo nelle voci del menu che le usano,
+# tramite lib.analisi_modelli, lib.analisi_test e lib.multiscelta.
+
 # ✅ Configura la pagina (deve essere il primo comando Streamlit)
 st.set_page_config(page_title="📊 Personas Model Analysis", layout="wide")
 
@@ -27,12 +27,13 @@ st.page_link("pages/3_Percezione_Cittadino.py", label="➡️ Vai a Percezione C
 st.markdown("---")
 
 # ✅ Carica dati reali dal Google Sheet
-sheet = get_sheet_by_name("Dati_Partecipante", "Partecipanti")
-
-if sheet:
-    data = sheet.get_all_records()
-    df_completo = pd.DataFrame(data)
+df_completo = load_mirror_df("Partecipanti")
 
+if df_completo is not None:
+    # Tabella pulita e feature condivise (cache per versione dei dati)
+    impronta_dati = dataframe_fingerprint(df_completo)
+    feature = feature_partecipanti(df_completo, impronta_dati)
+    df_completo = feature["dati"]
     tavola_rotonda = st.session_state.get("tavola_rotonda", None)
     if tavola_rotonda:
         df = df_completo[df_completo["Tavola rotonda"] == tavola_rotonda]
@@ -43,10 +44,22 @@ if sheet:
         scelta_manuale = st.selectbox("🔘 Seleziona manualmente la tavola rotonda da analizzare:", tavole_uniche)
         df = df_completo[df_completo["Tavola rotonda"] == scelta_manuale]
         st.info(f"📌 Analisi basata sulla tavola rotonda selezionata: **{scelta_manuale}**")
+        tavola_rotonda = scelta_manuale
 else:
     st.error("❌ Errore nel caricamento dei dati da Google Sheets.")
     st.stop()
 
+# ✅ Risultati delle analisi memoizzati per (analisi, tavola, contenuto dei dati):
+# cambiare voce del menu su dati già analizzati costa solo il rendering
+def memo(nome, calcolo, confronto=False):
+    # confronto=True: analisi su tutte le tavole (df_completo)
+    return analisi_memoizzata(nome, None if confronto else tavola_rotonda, impronta_dati, calcolo)
+
+
+def valori_multihot():
+    # 'Valori' codificati una volta su tutte le tavole (vocabolario condiviso)
+    return blocchi_multihot(df_completo)["Valori"]
+
 # Opzioni menu sidebar
 menu = [
     "Dataset", "Età e Coinvolgimento", "Conoscenza tema", "Visione e Valori",
@@ -68,7 +81,17 @@ if scelta == "Dataset":
 
 elif scelta == "Età e Coinvolgimento":
     tab1, tab2 = st.tabs(["🎯 Tavola selezionata", "📊 Confronto tra tavole"])
+    def _statistiche_tavola():
+        eta_stats = df['Età'].describe().to_frame().T
+        eta_stats.index = ["Età"]
+        coinvolgimento_counts = df["Coinvolgimento"].value_counts().sort_index().reset_index()
+        coinvolgimento_counts.columns = ["Coinvolgimento", "Partecipanti"]
+        coinv_stats = df['Coinvolgimento'].describe().to_frame().T
+        coinv_stats.index = ["Coinvolgimento"]
+        return {"eta_stats": eta_stats, "coinvolgimento_counts": coinvolgimento_counts, "coinv_stats": coinv_stats}
+
     with tab1:
+        risultati = memo("Età e Coinvolgimento", _statistiche_tavola)
         st.subheader("📊 Distribuzione dell'età dei partecipanti")
         fig_eta = px.histogram(df, x="Età", nbins=10, title="Distribuzione dell'età",
                                labels={"Età": "Età (anni)"}, color_discrete_sequence=["#2ca02c"], text_auto=True)
@@ -76,8 +99,7 @@ elif scelta == "Età e Coinvolgimento":
         st.plotly_chart(fig_eta, use_container_width=True)
         # Statistiche descrittive - Età
         st.markdown("#### 📈 Statistiche descrittive - Età")
-        eta_stats = df['Età'].describe().to_frame().T
-        eta_stats.index = ["Età"]
+        eta_stats = risultati["eta_stats"]
         
         st.dataframe(
             eta_stats.style
@@ -91,8 +113,7 @@ elif scelta == "Età e Coinvolgimento":
         )
     
         st.subheader("📈 Livello di coinvolgimento")
-        coinvolgimento_counts = df["Coinvolgimento"].value_counts().sort_index().reset_index()
-        coinvolgimento_counts.columns = ["Coinvolgimento", "Partecipanti"]
+        coinvolgimento_counts = risultati["coinvolgimento_counts"]
         fig_coinv = px.bar(coinvolgimento_counts, x="Coinvolgimento", y="Partecipanti",
                            title="Coinvolgimento dichiarato",
                            labels={"Coinvolgimento": "Livello (1–10)", "Partecipanti": "N. partecipanti"},
@@ -101,8 +122,7 @@ elif scelta == "Età e Coinvolgimento":
         st.plotly_chart(fig_coinv, use_container_width=True)
         # Statistiche descrittive - Coinvolgimento
         st.markdown("#### 📈 Statistiche descrittive - Coinvolgimento")
-        coinv_stats = df['Coinvolgimento'].describe().to_frame().T
-        coinv_stats.index = ["Coinvolgimento"]
+        coinv_stats = risultati["coinv_stats"]
         
         st.dataframe(
             coinv_stats.style
@@ -117,15 +137,16 @@ elif scelta == "Età e Coinvolgimento":
 
     # --- TAB 2: Confronto tra tavole rotonde ---
     with tab2:
+        from lib.analisi_test import confronto_tavole
+        confronto = memo("Età e Coinvolgimento - confronto", lambda: confronto_tavole(df_completo), confronto=True)
+
         st.subheader("📊 Età media per tavola rotonda")
-        eta_media = df_completo.groupby("Tavola rotonda")["Età"].mean().reset_index()
-        fig_eta_confronto = px.bar(eta_media, x="Tavola rotonda", y="Età", title="Età media per tavola rotonda",
+        fig_eta_confronto = px.bar(confronto["eta_media"], x="Tavola rotonda", y="Età", title="Età media per tavola rotonda",
                                    labels={"Età": "Età media"}, text_auto=True, color_discrete_sequence=["#2ca02c"])
         st.plotly_chart(fig_eta_confronto, use_container_width=True)
     
         st.subheader("📈 Coinvolgimento medio per tavola rotonda")
-        coinv_media = df_completo.groupby("Tavola rotonda")["Coinvolgimento"].mean().reset_index()
-        fig_coinv_confronto = px.bar(coinv_media, x="Tavola rotonda", y="Coinvolgimento",
+        fig_coinv_confronto = px.bar(confronto["coinv_media"], x="Tavola rotonda", y="Coinvolgimento",
                                      title="Coinvolgimento medio per tavola rotonda",
                                      labels={"Coinvolgimento": "Coinvolgimento medio"},
                                      text_auto=True, color_discrete_sequence=["#1f77b4"])
@@ -144,48 +165,15 @@ elif scelta == "Età e Coinvolgimento":
          # ===  === === === === === === === === === === === === === === === === === === === === === === === === === === === === === === === === === === === ===
         # === Analisi statistica ===
         st.subheader("📊 Test ANOVA – Differenze tra tavole")
-        
-        from scipy.stats import f_oneway, kruskal, shapiro
-        import scikit_posthocs as sp
-        
-        # Gruppi per variabili
-        gruppi_coinv = [g["Coinvolgimento"].dropna().values for _, g in df_completo.groupby("Tavola rotonda") if len(g["Coinvolgimento"].dropna()) > 1]
-        gruppi_eta = [g["Età"].dropna().values for _, g in df_completo.groupby("Tavola rotonda") if len(g["Età"].dropna()) > 1]
-        
-        # ANOVA
-        anova_coinv = f_oneway(*gruppi_coinv)
-        anova_eta = f_oneway(*gruppi_eta)
-        
-        # Verifica normalità
-        def check_normality(col):
-            return all(shapiro(g[col].dropna())[1] > 0.05 for _, g in df_completo.groupby("Tavola rotonda") if len(g[col].dropna()) >= 3)
-        
-        normal_eta = check_normality("Età")
-        normal_coinv = check_normality("Coinvolgimento")
-        
-        # Kruskal-Wallis se necessario
-        kruskal_eta = kruskal(*gruppi_eta) if not normal_eta else None
-        kruskal_coinv = kruskal(*gruppi_coinv) if not normal_coinv else None
-        
-        # Tabella dei risultati
-        df_anova = pd.DataFrame({
-            "Variabile": ["Età", "Coinvolgimento"],
-            "F-value (ANOVA)": [anova_eta.statistic, anova_coinv.statistic],
-            "p-value (ANOVA)": [anova_eta.pvalue, anova_coinv.pvalue],
-            "Distribuzione normale?": ["✅" if normal_eta else "❌", "✅" if normal_coinv else "❌"],
-            "Test alternativo": ["Kruskal-Wallis" if not normal_eta else "-", "Kruskal-Wallis" if not normal_coinv else "-"],
-            "H-value (Kruskal)": [kruskal_eta.statistic if kruskal_eta else None,
-                                  kruskal_coinv.statistic if kruskal_coinv else None],
-            "p-value (Kruskal)": [kruskal_eta.pvalue if kruskal_eta else None,
-                                  kruskal_coinv.pvalue if kruskal_coinv else None]
-        })
-        st.dataframe(df_anova, use_container_width=True)
+        st.dataframe(confronto["df_anova"], use_container_width=True)
         
         # Tabella semafori
-        anova_eta_sig = "✅" if anova_eta.pvalue < 0.05 else "❌"
-        anova_coinv_sig = "✅" if anova_coinv.pvalue < 0.05 else "❌"
-        kruskal_eta_sig = "✅" if kruskal_eta and kruskal_eta.pvalue < 0.05 else "❌"
-        kruskal_coinv_sig = "✅" if kruskal_coinv and kruskal_coinv.pvalue < 0.05 else "❌"
+        normal_eta = confronto["normal_eta"]
+        normal_coinv = confronto["normal_coinv"]
+        anova_eta_sig = "✅" if confronto["anova_eta_p"] < 0.05 else "❌"
+        anova_coinv_sig = "✅" if confronto["anova_coinv_p"] < 0.05 else "❌"
+        kruskal_eta_sig = "✅" if confronto["kruskal_eta_p"] is not None and confronto["kruskal_eta_p"] < 0.05 else "❌"
+        kruskal_coinv_sig = "✅" if confronto["kruskal_coinv_p"] is not None and confronto["kruskal_coinv_p"] < 0.05 else "❌"
         
         st.markdown(f"""
         ---
@@ -206,51 +194,15 @@ elif scelta == "Età e Coinvolgimento":
         
         # === POST-HOC ===
         st.subheader("🔎 Analisi post-hoc")
-        
-        from statsmodels.stats.multicomp import pairwise_tukeyhsd
-        
-        if normal_eta and anova_eta.pvalue < 0.05:
-            st.markdown("**Post-hoc Tukey HSD – Età**")
-            tukey_eta = pairwise_tukeyhsd(df_completo["Età"], df_completo["Tavola rotonda"])
-            st.dataframe(pd.DataFrame(tukey_eta.summary().data[1:], columns=tukey_eta.summary().data[0]), use_container_width=True)
-        
-        if not normal_eta and kruskal_eta and kruskal_eta.pvalue < 0.05:
-            st.markdown("**Post-hoc Dunn – Età**")
-            dunn_eta = sp.posthoc_dunn(df_completo, val_col='Età', group_col='Tavola rotonda', p_adjust='bonferroni')
-            st.dataframe(dunn_eta, use_container_width=True)
-        
-        if normal_coinv and anova_coinv.pvalue < 0.05:
-            st.markdown("**Post-hoc Tukey HSD – Coinvolgimento**")
-            tukey_coinv = pairwise_tukeyhsd(df_completo["Coinvolgimento"], df_completo["Tavola rotonda"])
-            st.dataframe(pd.DataFrame(tukey_coinv.summary().data[1:], columns=tukey_coinv.summary().data[0]), use_container_width=True)
-        
-        if not normal_coinv and kruskal_coinv and kruskal_coinv.pvalue < 0.05:
-            st.markdown("**Post-hoc Dunn – Coinvolgimento**")
-            dunn_coinv = sp.posthoc_dunn(df_completo, val_col='Coinvolgimento', group_col='Tavola rotonda', p_adjust='bonferroni')
-            st.dataframe(dunn_coinv, use_container_width=True)
+        for titolo, tabella in confronto["posthoc"].items():
+            st.markdown(f"**{titolo}**")
+            st.dataframe(tabella, use_container_width=True)
         
         # === TEST DI NORMALITÀ ===
         st.subheader("🧪 Test di normalità (Shapiro-Wilk)")
-        def normality_test_by_group(df, column):
-            results = []
-            for name, group in df.groupby("Tavola rotonda"):
-                vals = group[column].dropna()
-                if len(vals) >= 3:
-                    stat, p = shapiro(vals)
-                    results.append({
-                        "Tavola rotonda": name,
-                        "Variabile": column,
-                        "Shapiro-Wilk W": stat,
-                        "p-value": p,
-                        "Normale (α=0.05)": "✅" if p > 0.05 else "❌"
-                    })
-            return pd.DataFrame(results)
-        
-        st.markdown("#### Età")
-        st.dataframe(normality_test_by_group(df_completo, "Età"), use_container_width=True)
-        
-        st.markdown("#### Coinvolgimento")
-        st.dataframe(normality_test_by_group(df_completo, "Coinvolgimento"), use_container_width=True)
+        for col, tabella in confronto["normalita"].items():
+            st.markdown(f"#### {col}")
+            st.dataframe(tabella, use_container_width=True)
                 
 
          # ===  === === === === === === === === === === === === === === === === === === === === === === === === === === === === === === === === === === === ===
@@ -276,35 +228,40 @@ elif scelta == "Conoscenza tema":
 elif scelta == "Visione e Valori":
     tab1, tab2 = st.tabs(["🎯 Tavola selezionata", "📊 Confronto tra quartieri"])
 
-    with tab1:
-        st.subheader("🧭 Visione")
+    def _visione_valori():
         visione_counts = df["Visione"].value_counts().reset_index()
         visione_counts.columns = ["Visione", "Partecipanti"]
+        valori_counts = valori_multihot().righe(df.index).frequenze().rename_axis("Valore").reset_index()
+        return visione_counts, valori_counts
+
+    def _visione_valori_confronto():
+        visione_confronto = df_completo.groupby(["Tavola rotonda", "Visione"]).size().reset_index(name="Frequenza")
+        valori_confronto = valori_multihot().per_gruppo(df_completo["Tavola rotonda"])
+        valori_confronto.columns = ["Tavola rotonda", "Valore", "Frequenza"]
+        return visione_confronto, valori_confronto
+
+    with tab1:
+        visione_counts, valori_counts = memo("Visione e Valori", _visione_valori)
+        st.subheader("🧭 Visione")
         fig_visione = px.bar(visione_counts, x="Visione", y="Partecipanti",
                              text_auto=True, color_discrete_sequence=["#2ca02c"],
                              title="Visione dei partecipanti")
         st.plotly_chart(fig_visione, use_container_width=True)
 
         st.subheader("💡 Valori più rappresentati")
-        valori_series = df["Valori"].str.split(", ").explode()
-        valori_counts = valori_series.value_counts().reset_index()
-        valori_counts.columns = ["Valore", "Frequenza"]
         fig_valori = px.bar(valori_counts, x="Valore", y="Frequenza",
                             text_auto=True, color_discrete_sequence=["#1f77b4"],
                             title="Distribuzione dei valori indicati")
         st.plotly_chart(fig_valori, use_container_width=True)
 
     with tab2:
+        visione_confronto, valori_confronto = memo("Visione e Valori - confronto", _visione_valori_confronto, confronto=True)
         st.subheader("📊 Visione nei diversi quartieri")
-        visione_confronto = df_completo.groupby(["Tavola rotonda", "Visione"]).size().reset_index(name="Frequenza")
         fig = px.bar(visione_confronto, x="Visione", y="Frequenza", color="Tavola rotonda", barmode="group",
                      title="Distribuzione delle visioni per tavola rotonda", text_auto=True)
         st.plotly_chart(fig, use_container_width=True)
 
         st.subheader("📊 Valori nei diversi quartieri")
-        valori_series_all = df_completo["Valori"].str.split(", ").explode()
-        valori_confronto = valori_series_all.groupby([df_completo["Tavola rotonda"], valori_series_all]).size().reset_index(name="Frequenza")
-        valori_confronto.columns = ["Tavola rotonda", "Valore", "Frequenza"]
         fig_valori = px.bar(valori_confronto, x="Valore", y="Frequenza", color="Tavola rotonda", barmode="group",
                             title="Valori per tavola rotonda", text_auto=True)
         st.plotly_chart(fig_valori, use_container_width=True)
@@ -312,7 +269,7 @@ elif scelta == "Visione e Valori":
          # ===  === === === === === === === === === === === === === === === === === === === === === === === === === === === === === === === === === === === ===
 
 elif scelta == "Correlazioni":
-    corr = df[["Età", "Coinvolgimento", "Conoscenza tema"]].corr()
+    corr = memo("Correlazioni", lambda: df[["Età", "Coinvolgimento", "Conoscenza tema"]].corr())
     st.dataframe(corr.style.background_gradient(cmap='RdBu_r', axis=None))
 
 elif scelta == "Boxplot":
@@ -322,35 +279,19 @@ elif scelta == "Boxplot":
     st.plotly_chart(fig2, use_container_width=True)
 
 elif scelta == "K-Means Clustering":
-    features = df[["Età", "Coinvolgimento", "Conoscenza tema"]]
-    scaled = StandardScaler().fit_transform(features)
-    kmeans = KMeans(n_clusters=3, random_state=42).fit(scaled)
-    df["Cluster"] = kmeans.labels_
+    from lib.analisi_modelli import kmeans_profilo
+    df["Cluster"] = memo("K-Means Clustering", lambda: kmeans_profilo(feature["scalate"].loc[df.index]))
     fig = px.scatter_3d(df, x="Età", y="Coinvolgimento", z="Conoscenza tema", color="Cluster", title="Cluster 3D")
     st.plotly_chart(fig, use_container_width=True)
 
 elif scelta == "Pareto Valori":
-    valori_series = df["Valori"].str.split(", ").explode()
-    valori_count = valori_series.value_counts().reset_index()
-    valori_count.columns = ["Valore", "Frequenza"]
-    valori_count["Cumulata %"] = valori_count["Frequenza"].cumsum() / valori_count["Frequenza"].sum() * 100
+    valori_count = memo("Pareto Valori", lambda: valori_multihot().righe(df.index).pareto())
     fig = px.bar(valori_count, x="Valore", y="Frequenza", title="Pareto Valori")
     st.plotly_chart(fig, use_container_width=True)
 
 elif scelta == "Clusterizzazione semplificata":
-    def assegna_persona(row):
-        if row["Età"] < 30 and row["Coinvolgimento"] >= 7:
-            return "🧑‍🎓 Giovane attivista"
-        elif row["Ruolo"] == "Tecnico/Esperto" and row["Conoscenza tema"] >= 7:
-            return "🧑‍🔬 Esperto tecnico"
-        elif row["Esperienza"] == "No" and row["Coinvolgimento"] < 4:
-            return "👤 Cittadino curioso"
-        elif row["Ruolo"] == "Rappresentante istituzionale":
-            return "🏛️ Rappresentante"
-        else:
-            return "🌍 Partecipante coinvolto"
-
-    df["PersonaModel"] = df.apply(assegna_persona, axis=1)
+    # Regole vettoriali (lib.persona), eventualmente personalizzate per quartiere
+    df["PersonaModel"] = assegna_persona(df, st.session_state.get("quartiere"))
     st.dataframe(df[["Nome", "PersonaModel"]])
     st.bar_chart(df["PersonaModel"].value_counts())
 
@@ -359,7 +300,7 @@ elif scelta == "Esporta CSV":
     st.download_button("📥 Scarica CSV", csv, "analisi_personas.csv", "text/csv")
 
 elif scelta == "Heatmap Ruolo vs Coinvolgimento":
-    pivot = df.pivot_table(index="Ruolo", values="Coinvolgimento", aggfunc="mean")
+    pivot = memo("Heatmap Ruolo vs Coinvolgimento", lambda: df.pivot_table(index="Ruolo", values="Coinvolgimento", aggfunc="mean"))
     st.dataframe(pivot.style.background_gradient(cmap="YlOrRd"))
 
 elif scelta == "Gap Coinvolgimento-Conoscenza":
@@ -369,8 +310,9 @@ elif scelta == "Gap Coinvolgimento-Conoscenza":
 
 elif scelta == "Radar PersonaModel":
     import plotly.graph_objects as go
-    if "PersonaModel" not in df:
-        st.warning("⚠️ Prima esegui la clusterizzazione semplificata.")
+    df["PersonaModel"] = assegna_persona(df, st.session_state.get("quartiere"))
+    if df.empty:
+        st.warning("⚠️ Nessun partecipante da analizzare per questa tavola rotonda.")
     else:
         radar_df = df.groupby("PersonaModel")[["Età", "Coinvolgimento", "Conoscenza tema"]].mean()
         categories = list(radar_df.columns)
@@ -381,45 +323,42 @@ elif scelta == "Radar PersonaModel":
         st.plotly_chart(fig, use_container_width=True)
 
 elif scelta == "Ambito vs Visione":
-    cross = pd.crosstab(df["Ambito"], df["Visione"])
+    cross = memo("Ambito vs Visione", lambda: pd.crosstab(df["Ambito"], df["Visione"]))
     st.dataframe(cross)
     fig = px.bar(cross, barmode="group", title="Ambiti e orientamento di visione")
     st.plotly_chart(fig, use_container_width=True)
 
 elif scelta == "Statistica descrittiva":
-    descrittive = df[["Età", "Coinvolgimento", "Conoscenza tema"]].describe()
+    descrittive = memo("Statistica descrittiva", lambda: df[["Età", "Coinvolgimento", "Conoscenza tema"]].describe())
     st.dataframe(descrittive.style.format("{:.2f}").background_gradient(cmap="Blues"))
 
 elif scelta == "Test ANOVA e Normalità":
-    for col in ["Età", "Coinvolgimento", "Conoscenza tema"]:
-        stat, p = stats.shapiro(df[col])
+    from lib.analisi_test import test_anova_normalita
+    shapiro_p, p_anova = memo("Test ANOVA e Normalità", lambda: test_anova_normalita(df))
+    for col, p in shapiro_p.items():
         st.write(f"🔹 {col}: p-value = {p:.4f} ({'Distribuzione normale' if p > 0.05 else 'Non normale'})")
     st.markdown("---")
-    gruppi = [df[df["Ruolo"] == ruolo]["Coinvolgimento"] for ruolo in df["Ruolo"].unique()]
-    stat, p = stats.f_oneway(*gruppi)
-    st.write(f"**ANOVA Coinvolgimento per Ruolo**: p-value = {p:.4f}")
+    st.write(f"**ANOVA Coinvolgimento per Ruolo**: p-value = {p_anova:.4f}")
 
 elif scelta == "PCA 2D":
-    pca_features = df[["Età", "Coinvolgimento", "Conoscenza tema"]]
-    scaler = StandardScaler()
-    scaled_pca = scaler.fit_transform(pca_features)
-    pca = PCA(n_components=2)
-    components = pca.fit_transform(scaled_pca)
-    df_pca = pd.DataFrame(components, columns=["PC1", "PC2"])
-    df_pca["Ruolo"] = df["Ruolo"]
+    from lib.analisi_modelli import pca_profilo
+    df_pca = memo("PCA 2D", lambda: pca_profilo(feature["scalate"].loc[df.index], df["Ruolo"]))
     fig = px.scatter(df_pca, x="PC1", y="PC2", color="Ruolo", title="Proiezione PCA 2D per Ruolo")
     st.plotly_chart(fig, use_container_width=True)
 
 elif scelta == "Silhouette Score":
-    X = df[["Età", "Coinvolgimento", "Conoscenza tema"]]
-    X_scaled = StandardScaler().fit_transform(X)
-    scores = []
-    k_range = range(2, 8)
-    for k in k_range:
-        km = KMeans(n_clusters=k, random_state=42)
-        labels = km.fit_predict(X_scaled)
-        score = silhouette_score(X_scaled, labels)
-        scores.append(score)
-    score_df = pd.DataFrame({"k": list(k_range), "Silhouette Score": scores})
-    fig = px.line(score_df, x="k", y="Silhouette Score", markers=True, title="Silhouette Score per K")
-    st.plotly_chart(fig, use_container_width=True)
+    from lib.analisi_modelli import selezione_k_profilo
+    score_df = memo("Silhouette Score", lambda: selezione_k_profilo(feature["scalate"].loc[df.index]))
+    if score_df.empty:
+        st.warning("⚠️ Non ci sono abbastanza partecipanti per confrontare i cluster.")
+    else:
+        fig = px.line(score_df, x="k", y="Silhouette", markers=True, title="Silhouette Score per K")
+        st.plotly_chart(fig, use_container_width=True)
+        col1, col2 = st.columns(2)
+        with col1:
+            fig_gomito = px.line(score_df, x="k", y="Inerzia", markers=True, title="Metodo del gomito (inerzia)")
+            st.plotly_chart(fig_gomito, use_container_width=True)
+        with col2:
+            fig_ch = px.line(score_df, x="k", y="Calinski-Harabasz", markers=True, title="Indice di Calinski-Harabasz")
+            st.plotly_chart(fig_ch, use_container_width=True)
+        st.dataframe(score_df.set_index("k").style.format("{:.3f}"), use_container_width=True)
@@ -4,7 +4,8 @@ import numpy as np
 import io
 from datetime import datetime
 from lib.style import apply_custom_style
-from lib.google_sheet import get_sheet_by_name
+from lib.ahp import matrici_da_giudizi, analizza, codifica_giudizi, SOGLIA_CR
+from lib.save_to_sheet import save_to_sheet, mostra_stato_salvataggi
 
 # ✅ Configura e applica lo stile
 st.set_page_config(page_title="🌿 Percezione Verde Urbano", layout="wide")
@@ -20,6 +21,9 @@ if "id_partecipante" not in st.session_state:
     st.error("❌ Identificativo partecipante mancante. Torna alla pagina di registrazione.")
     st.stop()
 
+# ✅ Esito dei salvataggi in background
+mostra_stato_salvataggi()
+
 # ✅ Titolo e istruzioni
 st.title("Valutazione della Percezione del Verde Urbano")
 
@@ -40,7 +44,6 @@ elementi_verde = [
 st.subheader("Confronti AHP tra gli elementi del verde urbano")
 
 n = len(elementi_verde)
-comparison_matrix = np.ones((n, n))
 
 # ✅ Form con confronti AHP
 with st.form("form_ahp_verde"):
@@ -50,20 +53,23 @@ with st.form("form_ahp_verde"):
         for j in range(i+1, n):
             el_i = elementi_verde[i]
             el_j = elementi_verde[j]
+            # L'ordine delle etichette segue la codifica di lib.ahp.VALORI_GIUDIZIO
+            etichette = (
+                "Sono equamente importanti",
+                f"{el_i} è poco più importante di {el_j}",
+                f"{el_i} è abbastanza più importante di {el_j}",
+                f"{el_i} è decisamente più importante di {el_j}",
+                f"{el_i} è assolutamente più importante di {el_j}",
+                f"{el_j} è poco più importante di {el_i}",
+                f"{el_j} è abbastanza più importante di {el_i}",
+                f"{el_j} è decisamente più importante di {el_i}",
+                f"{el_j} è assolutamente più importante di {el_i}"
+            )
             with st.expander(f"Confronta: {el_i} vs {el_j}", expanded=False):
                 option = st.radio(
                     "Quanto è più importante uno rispetto all'altro?",
-                    (
-                        "Sono equamente importanti",
-                        f"{el_i} è poco più importante di {el_j}",
-                        f"{el_i} è abbastanza più importante di {el_j}",
-                        f"{el_i} è decisamente più importante di {el_j}",
-                        f"{el_i} è assolutamente più importante di {el_j}",
-                        f"{el_j} è poco più importante di {el_i}",
-                        f"{el_j} è abbastanza più importante di {el_i}",
-                        f"{el_j} è decisamente più importante di {el_i}",
-                        f"{el_j} è assolutamente più importante di {el_i}"
-                    ),
+                    range(len(etichette)),
+                    format_func=lambda k, etichette=etichette: etichette[k],
                     index=0,
                     key=f"{i}_{j}"
                 )
@@ -73,33 +79,15 @@ with st.form("form_ahp_verde"):
 
 # ✅ Calcolo della matrice AHP e salvataggio
 if submitted:
-    scale_map = {
-        "poco più importante": 3,
-        "abbastanza più importante": 5,
-        "decisamente più importante": 7,
-        "assolutamente più importante": 9
-    }
-
-    for i in range(n):
-        for j in range(i+1, n):
-            option = responses[f"{i}_{j}"]
-            if "equamente" in option:
-                val = 1
-            elif elementi_verde[i] in option:
-                val = next((v for k, v in scale_map.items() if k in option), 1)
-            elif elementi_verde[j] in option:
-                val = 1 / next((v for k, v in scale_map.items() if k in option), 1)
-            else:
-                val = 1
-            comparison_matrix[i, j] = val
-            comparison_matrix[j, i] = 1 / val
-
+    # Giudizi codificati per indice, nello stesso ordine delle coppie (i < j)
+    giudizi = [responses[f"{i}_{j}"] for i in range(n) for j in range(i+1, n)]
+    comparison_matrix = matrici_da_giudizi(giudizi, n)[0]
     matrix_df = pd.DataFrame(comparison_matrix, index=elementi_verde, columns=elementi_verde)
 
-    eigvals, eigvecs = np.linalg.eig(comparison_matrix)
-    max_index = np.argmax(eigvals.real)
-    weights = eigvecs[:, max_index].real
-    weights /= weights.sum()
+    # Pesi e consistenza (λmax, CI, CR) in un solo passaggio
+    risultato = analizza(comparison_matrix)
+    weights = risultato["pesi"][0]
+    cr = float(risultato["cr"][0])
 
     weights_df = pd.DataFrame({
         "Elemento": elementi_verde,
@@ -109,20 +97,23 @@ if submitted:
     st.subheader("📌 Pesi Relativi Calcolati")
     st.dataframe(weights_df)
 
+    st.metric("Rapporto di consistenza (CR)", f"{cr:.3f}")
+    if cr > SOGLIA_CR:
+        st.warning(f"⚠️ I giudizi sono poco coerenti (CR > {SOGLIA_CR}). Puoi rivedere i confronti e ricalcolare.")
+
     # ✅ Salvataggio su Google Sheet
-    sheet = get_sheet_by_name("Dati_Partecipante", "Pesi Parametri")
-    if sheet:
-        row = {
-            "Timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "ID Partecipante": st.session_state["id_partecipante"],
-            "Tavola rotonda": st.session_state.get("tavola_rotonda", "non specificata")
-        }
-        for elemento, peso in zip(elementi_verde, weights):
-            row[elemento] = round(peso, 4)
-        sheet.append_row(list(row.values()))
-        st.success("✅ Valutazione salvata nel foglio 'Pesi Parametri'!")
-    else:
-        st.error("❌ Errore nel salvataggio su Google Sheet.")
+    row = {
+        "Timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "ID Partecipante": st.session_state["id_partecipante"],
+        "Tavola rotonda": st.session_state.get("tavola_rotonda", "non specificata")
+    }
+    for elemento, peso in zip(elementi_verde, weights):
+        row[elemento] = round(peso, 4)
+    row["CR"] = round(cr, 4)
+    row["Giudizi"] = codifica_giudizi(giudizi)
+    # Le righe sono accodate per posizione: il quartiere va dopo le colonne esistenti
+    row["Quartiere"] = st.session_state.get("quartiere", "")
+    save_to_sheet(row, "Pesi Parametri")
 
     # ✅ Salva in sessione anche per la prossima pagina
     st.session_state["matrice_utente"] = matrix_df
@@ -2,31 +2,18 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import plotly.express as px
-from sklearn.cluster import KMeans
-from scipy.stats import f_oneway
-from lib.google_sheet import get_sheet_by_name
+from lib.sheet_mirror import load_mirror_df
 from lib.style import apply_custom_style
+from lib.ahp import SOGLIA_CR
+from lib.ahp_gruppi import get_aggregatore, ELEMENTI_VERDE
+from lib.fatti_partecipanti import get_tabella_fatti, TAVOLA
+from lib.feature_partecipanti import feature_partecipanti
 
 st.set_page_config(page_title="🔍 Matrice dei Pesi", layout="wide")
 apply_custom_style()
 
 st.title("4. Matrice dei Pesi")
 
-# ✅ Carica i dati da Google Sheets
-sheet_weights = get_sheet_by_name("Dati_Partecipante", "Pesi Parametri")
-sheet_profiles = get_sheet_by_name("Dati_Partecipante", "Partecipanti")
-
-if not sheet_weights or not sheet_profiles:
-    st.error("❌ Impossibile caricare i dati dal Google Sheet.")
-    st.stop()
-
-# ✅ Importa i dati
-df_weights = pd.DataFrame(sheet_weights.get_all_records())
-df_profiles = pd.DataFrame(sheet_profiles.get_all_records())
-
-# ✅ Merge sui nomi (Utente)
-df_merged = pd.merge(df_weights, df_profiles, how="inner", left_on="Utente", right_on="Nome")
-
 # ✅ Colonne AHP e meta
 elementi_verde = [
     "Accessibilità del verde",
@@ -36,7 +23,56 @@ elementi_verde = [
     "Funzione ambientale (es. ombra, qualità aria)"
 ]
 
-tavola_column = [col for col in df_merged.columns if "Tavola rotonda" in col][0]
+# ✅ Carica i dati da Google Sheets
+df_weights = load_mirror_df("Pesi Parametri")
+df_profiles = load_mirror_df("Partecipanti")
+
+if df_weights is None or df_profiles is None:
+    st.error("❌ Impossibile caricare i dati dal Google Sheet.")
+    st.stop()
+
+# Profili puliti e tipizzati dal feature store condiviso (pagine 2, 4 e 99)
+df_profiles = feature_partecipanti(df_profiles)["dati"]
+
+# ✅ Aggregati di gruppo incrementali: si elaborano solo le righe nuove
+aggregatore = get_aggregatore(ELEMENTI_VERDE)
+aggregatore.aggiorna_da_tabella(df_weights)
+
+# ✅ Tabella dei fatti per partecipante (pesi AHP + profilo), aggiornata
+# solo con le righe nuove: nessun merge sull'intero foglio a ogni rerun
+tabella_fatti = get_tabella_fatti()
+try:
+    tabella_fatti.aggiorna(df_weights, df_profiles)
+except KeyError as e:
+    st.error(f"❌ {e}")
+    st.stop()
+df_merged = tabella_fatti.fatti()
+
+if df_merged.empty or TAVOLA not in df_merged.columns:
+    st.warning("⚠️ Nessun partecipante con pesi AHP e profilo da analizzare.")
+    st.stop()
+
+# ✅ Filtro opzionale sulle risposte AHP incoerenti (CR salvato dalla pagina 3)
+maschera_cr = None
+if "CR" in df_merged.columns:
+    if st.sidebar.checkbox(f"Escludi risposte incoerenti (CR > {SOGLIA_CR})", value=False):
+        cr = pd.to_numeric(df_merged["CR"], errors="coerce")
+        maschera_cr = cr.isna() | (cr <= SOGLIA_CR)
+        df_merged = df_merged[maschera_cr]
+
+tavola_column = TAVOLA
+
+# ✅ Cluster AHP: k=2..6 addestrati una volta per versione dei dati;
+# il k scelto resta in sessione ed è condiviso dalle tre viste sui cluster
+st.session_state.setdefault("k_cluster_ahp", 3)
+
+
+def etichette_cluster():
+    from lib.clustering import kmeans_sweep  # scikit-learn solo per le viste sui cluster
+    risultati = kmeans_sweep(df_merged, elementi_verde)
+    k = st.session_state["k_cluster_ahp"]
+    return risultati[k]["etichette"] if k in risultati else None
+
 
 # ✅ Menu a sinistra per selezionare analisi
 analisi = st.sidebar.radio("📌 Seleziona Analisi", [
@@ -54,25 +90,43 @@ if analisi == "Dataset Combinato":
 
 elif analisi == "Statistica Tavole":
     st.subheader("📊 Confronto tra Tavole rotonde")
-    mean_by_round = df_merged.groupby(tavola_column)[elementi_verde].mean()
+    # Medie sui partecipanti della tabella dei fatti (indice per tavola), con o senza filtro CR
+    mean_by_round = pd.DataFrame({
+        tavola: righe[elementi_verde].mean()
+        for tavola, righe in tabella_fatti.per_tavola(maschera_cr).items()
+    }).T.rename_axis(tavola_column)
     st.dataframe(mean_by_round)
     fig1 = px.bar(mean_by_round.T, barmode="group", title="Pesi AHP medi per Tavola rotonda")
     st.plotly_chart(fig1, use_container_width=True)
 
+    pesi_gruppo = aggregatore.tabella_gruppo("tavola")
+    if not pesi_gruppo.empty:
+        st.markdown("#### 🤝 Pesi di gruppo (media geometrica dei giudizi)")
+        st.caption("Calcolati su tutte le risposte del foglio 'Pesi Parametri', senza filtro CR.")
+        st.dataframe(pesi_gruppo)
+
 elif analisi == "ANOVA Tavole":
     st.subheader("📐 Test ANOVA tra Tavole rotonde")
-    for elemento in elementi_verde:
-        gruppi = [group[elemento].values for name, group in df_merged.groupby(tavola_column)]
-        stat, p = f_oneway(*gruppi)
-        st.write(f"🔸 {elemento}: p-value = {p:.4f} ({'⚠️ Differenze significative' if p < 0.05 else 'Nessuna differenza significativa'})")
+    from lib.statistiche import statistiche_per_gruppo
+    stat = statistiche_per_gruppo(df_merged, tavola_column, elementi_verde)
+    for _, riga in stat["riepilogo"].iterrows():
+        p = riga["p (ANOVA)"]
+        st.write(f"🔸 {riga['Variabile']}: p-value = {p:.4f} ({'⚠️ Differenze significative' if p < 0.05 else 'Nessuna differenza significativa'})")
+
+    with st.expander("🧪 Normalità, Kruskal-Wallis e post-hoc"):
+        st.dataframe(stat["riepilogo"].set_index("Variabile"), use_container_width=True)
+        st.dataframe(stat["normalita"], use_container_width=True)
+        for elemento, tabella in stat["posthoc"].items():
+            st.markdown(f"**{elemento}**")
+            st.dataframe(tabella, use_container_width=True)
 
 elif analisi == "Cluster AHP":
     st.subheader("🔎 Cluster sui profili AHP")
-    X = df_merged[elementi_verde].values
-    k = st.slider("Scegli il numero di cluster:", 2, 6, 3)
-    kmeans = KMeans(n_clusters=k, random_state=42).fit(X)
-    df_merged["Cluster"] = kmeans.labels_
-    valid_df = df_merged.dropna(subset=[elementi_verde[0], elementi_verde[1], "Cluster"])
+    from lib.clustering import K_RANGE
+    k = st.slider("Scegli il numero di cluster:", K_RANGE[0], K_RANGE[-1], st.session_state["k_cluster_ahp"])
+    st.session_state["k_cluster_ahp"] = k
+    etichette = etichette_cluster()
+    valid_df = df_merged.assign(Cluster=etichette).dropna(subset=[elementi_verde[0], elementi_verde[1], "Cluster"])
 
     if valid_df.empty:
         st.warning("⚠️ Non ci sono abbastanza dati validi per generare il grafico dei cluster.")
@@ -82,26 +136,34 @@ elif analisi == "Cluster AHP":
             x=elementi_verde[0],
             y=elementi_verde[1],
             color="Cluster",
-            hover_data=["Utente_x", tavola_column, "Età", "Ruolo", "Ambito"]
+            hover_data=[c for c in ["Utente", "Nome", tavola_column, "Età", "Ruolo", "Ambito"] if c in valid_df.columns]
         )
         st.plotly_chart(fig2, use_container_width=True)
 
 elif analisi == "Media per Cluster":
     st.subheader("📌 Media pesi AHP per Cluster")
-    if "Cluster" not in df_merged.columns:
-        st.warning("⚠️ Esegui prima il clustering nella sezione 'Cluster AHP'.")
+    etichette = etichette_cluster()
+    if etichette is None:
+        st.warning("⚠️ Non ci sono abbastanza dati validi per il clustering.")
     else:
-        media_cluster = df_merged.groupby("Cluster")[elementi_verde].mean()
+        st.caption(f"Numero di cluster: {st.session_state['k_cluster_ahp']} (modificabile in 'Cluster AHP')")
+        media_cluster = df_merged.assign(Cluster=etichette).groupby("Cluster")[elementi_verde].mean()
         st.dataframe(media_cluster)
         fig3 = px.bar(media_cluster.T, barmode="group", title="Distribuzione Pesi AHP per Cluster")
         st.plotly_chart(fig3, use_container_width=True)
 
 elif analisi == "Distribuzione Cluster":
     st.subheader("📊 Cluster per Tavola rotonda")
-    if "Cluster" not in df_merged.columns:
-        st.warning("⚠️ Esegui prima il clustering nella sezione 'Cluster AHP'.")
+    etichette = etichette_cluster()
+    if etichette is None:
+        st.warning("⚠️ Non ci sono abbastanza dati validi per il clustering.")
     else:
-        cross_tab = pd.crosstab(df_merged[tavola_column], df_merged["Cluster"])
+        st.caption(f"Numero di cluster: {st.session_state['k_cluster_ahp']} (modificabile in 'Cluster AHP')")
+        cross_tab = pd.DataFrame({
+            tavola: etichette.reindex(righe.index).dropna().astype(int).value_counts()
+            for tavola, righe in tabella_fatti.per_tavola(maschera_cr).items()
+        }).T.fillna(0).astype(int).sort_index(axis=1)
+        cross_tab = cross_tab.rename_axis(index=tavola_column, columns="Cluster")
         st.dataframe(cross_tab)
         fig4 = px.bar(cross_tab, barmode="group", title="Distribuzione dei Cluster per Tavola rotonda")
         st.plotly_chart(fig4, use_container_width=True)
@@ -3,7 +3,8 @@ import pandas as pd
 import pydeck as pdk
 from datetime import datetime
 from lib.style import apply_custom_style
-from lib.google_sheet import get_sheet_by_name
+from lib.sheet_cache import read_sheet_df
+from lib.save_to_sheet import upsert_rows_to_sheet, mostra_stato_salvataggi
 
 # ✅ Configura pagina e stile
 st.set_page_config(page_title="5. Valutazione dei parchi", layout="wide")
@@ -18,6 +19,9 @@ if "id_partecipante" not in st.session_state:
     st.error("❌ Identificativo partecipante mancante. Torna alla registrazione.")
     st.stop()
 
+# ✅ Esito dei salvataggi in background
+mostra_stato_salvataggi()
+
 # ✅ Titolo e descrizione
 st.title("5. Valutazione dei parchi di Bergamo")
 st.markdown("""
@@ -36,8 +40,7 @@ criteri = [
 
 # ✅ Carica i parchi da Google Sheet
 try:
-    sheet_parchi = get_sheet_by_name("Dati_Partecipante", "Informazioni Parchi")
-    df_parchi = pd.DataFrame(sheet_parchi.get_all_records())
+    df_parchi = read_sheet_df("Dati_Partecipante", "Informazioni Parchi")
 except Exception as e:
     st.error("❌ Errore nel caricamento dei dati dei parchi.")
     st.stop()
@@ -127,23 +130,21 @@ if st.session_state["valutazioni_parchi"]:
     st.write(pd.DataFrame(st.session_state["valutazioni_parchi"]).T)
 
     if st.button("📤 Invia tutte le valutazioni"):
-        try:
-            sheet_valutazioni = get_sheet_by_name("Dati_Partecipante", "Valutazione Parchi")
-            for parco, dati in st.session_state["valutazioni_parchi"].items():
-                row = {
-                    "Timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    "ID Partecipante": st.session_state["id_partecipante"],
-                    "Tavola rotonda": st.session_state.get("tavola_rotonda", "non specificata"),
-                    "Parco": parco,
-                }
-                for criterio in criteri:
-                    row[criterio] = dati.get(criterio, "")
-                row["Feedback"] = dati.get("Feedback", "")
-                sheet_valutazioni.append_row(list(row.values()))
-            st.success("✅ Tutte le valutazioni sono state salvate su Google Sheet!")
-        except Exception as e:
-            st.error("❌ Errore durante il salvataggio delle valutazioni.")
-            st.text(f"Dettaglio: {e}")
+        righe = []
+        for parco, dati in st.session_state["valutazioni_parchi"].items():
+            row = {
+                "Timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "ID Partecipante": st.session_state["id_partecipante"],
+                "Tavola rotonda": st.session_state.get("tavola_rotonda", "non specificata"),
+                "Parco": parco,
+            }
+            for criterio in criteri:
+                row[criterio] = dati.get(criterio, "")
+            row["Feedback"] = dati.get("Feedback", "")
+            righe.append(row)
+        # Scrittura unica e idempotente: un nuovo invio aggiorna le righe già salvate
+        with st.spinner("Salvataggio delle valutazioni..."):
+            upsert_rows_to_sheet(righe, "Valutazione Parchi", ["ID Partecipante", "Parco"])
 
 # ✅ Link alla pagina successiva
 st.markdown("---")
@@ -5,7 +5,9 @@ import plotly.express as px
 import plotly.graph_objects as go
 
 from lib.style import apply_custom_style
-from lib.google_sheet import get_sheet_by_name
+from lib.sheet_cache import read_sheets_parallel
+from lib.sheet_mirror import read_mirror_df
+from lib.ahp_gruppi import get_aggregatore, ELEMENTI_VERDE
 
 # -------------------- Utility & Config --------------------
 @st.cache_data
@@ -13,8 +15,7 @@ def to_numeric_df(df: pd.DataFrame, cols: list[str]) -> pd.DataFrame:
     df[cols] = df[cols].apply(pd.to_numeric, errors="coerce")
     return df
 
-@st.cache_data
-def load_data() -> dict[str, pd.DataFrame]:
+def load_data() -> tuple[dict[str, pd.DataFrame], dict[str, float]]:
     sheets = {
         "df_valutazioni": "Valutazione Parchi",
         "df_pesi": "Pesi Parametri",
@@ -22,7 +23,11 @@ def load_data() -> dict[str, pd.DataFrame]:
         "df_valutazioni_green": "Valutazione Parchi Verde",
         "df_pesi_green": "Pesi Parametri Verde",
     }
-    return {k: pd.DataFrame(get_sheet_by_name("Dati_Partecipante", v).get_all_records()) for k, v in sheets.items()}
+    # I fogli sono indipendenti: letti in parallelo dalla copia locale, con i tempi per foglio
+    dfs, timings = read_sheets_parallel(
+        "Dati_Partecipante", sheets, max_workers=len(sheets), reader=read_mirror_df
+    )
+    return dfs, {sheets[k]: t for k, t in timings.items()}
 
 # Convert comma decimals
 
@@ -38,7 +43,7 @@ apply_custom_style()
 st.title("6. Analisi e visualizzazione dei risultati")
 
 # -------------------- Load & Clean --------------------
-dfs = load_data()
+dfs, load_timings = load_data()
 df_val = dfs['df_valutazioni']
 df_pesi = dfs['df_pesi']
 df_info = dfs['df_info']
@@ -46,15 +51,17 @@ df_val_green = dfs['df_valutazioni_green']
 df_pesi_green = dfs['df_pesi_green']
 for df in (df_val, df_pesi, df_info, df_val_green, df_pesi_green):
     df.rename(columns=lambda c: str(c).strip(), inplace=True)
+# Aggregati per quartiere (condivisi con la pagina 4, sulle colonne originali
+# del foglio) aggiornati solo con le righe nuove
+aggregatore = get_aggregatore(ELEMENTI_VERDE)
+aggregatore.aggiorna_da_tabella(df_pesi)
 # Rename long columns
-df_val.rename(columns={
-    "Funzione sociale (es. luoghi di incontro)": "Funzione sociale",
-    "Funzione ambientale (es. ombra, qualità aria)": "Funzione ambientale"
-}, inplace=True)
-df_pesi.rename(columns={
+NOMI_BREVI = {
     "Funzione sociale (es. luoghi di incontro)": "Funzione sociale",
     "Funzione ambientale (es. ombra, qualità aria)": "Funzione ambientale"
-}, inplace=True)
+}
+df_val.rename(columns=NOMI_BREVI, inplace=True)
+df_pesi.rename(columns=NOMI_BREVI, inplace=True)
 
 # -------------------- Normalize Weights --------------------
 CRITERI_STD = [
@@ -81,6 +88,10 @@ page_sel = st.sidebar.radio("Vista:", [
 #     "Tavola rotonda:",
 #     ["Tutte"] + df_val["Tavola rotonda"].dropna().unique().tolist()
 # )
+with st.sidebar.expander("⏱️ Tempi di caricamento"):
+    st.dataframe(
+        pd.Series(load_timings, name="secondi").round(3).to_frame()
+    )
 quart_sel = st.sidebar.selectbox(
     "Quartiere:",
     ["Tutti"] + df_info["Quartiere"].dropna().unique().tolist()
@@ -91,7 +102,15 @@ if quart_sel != "Tutti":
 
 # -------------------- Compute Citizen Score --------------------
 media_std = df_val.groupby("Parco")[CRITERI_STD].mean()
-pesi_std = df_pesi[CRITERI_STD].mean()
+if quart_sel != "Tutti":
+    pesi_std = aggregatore.pesi_medi("quartiere", quart_sel)
+else:
+    pesi_std = aggregatore.pesi_medi("tutti")
+if pesi_std is None:
+    # Nessuna risposta completa per il gruppo negli aggregati: media del foglio
+    pesi_std = df_pesi[CRITERI_STD].mean()
+else:
+    pesi_std = (pesi_std / 100).rename(NOMI_BREVI)
 media_std["punteggio_std"] = media_std.mul(pesi_std).sum(axis=1)
 map_df_std = (
     media_std.reset_index()
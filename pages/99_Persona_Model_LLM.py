@@ -2,13 +2,14 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from kmodes.kprototypes import KPrototypes
-from lib.google_sheet import get_sheet_by_name
+from lib.sheet_mirror import load_mirror_df
+from lib.persona import assegna_persona
+from lib.feature_partecipanti import feature_partecipanti
+from lib.persona_cluster import cluster_partecipanti, STATO_IN_AGGIORNAMENTO
 import re
 import json
 
-# ✅ Import SDK Gemini
-from google import genai
+# L'SDK Gemini (google.genai) si importa solo alla pressione dei pulsanti
 
 # 🛠️ Impostazioni iniziali
 st.set_page_config(page_title="Cluster e Analisi Partecipanti", layout="wide")
@@ -17,9 +18,7 @@ st.set_page_config(page_title="Cluster e Analisi Partecipanti", layout="wide")
 tab1, tab2 = st.tabs(["📊 Cluster Insight", "📌 Pareto & Ishikawa"])
 
 # ✅ Carica i dati da Google Sheets
-sheet_profiles = get_sheet_by_name("Dati_Partecipante", "Partecipanti")
-data = sheet_profiles.get_all_records()
-df = pd.DataFrame(data)
+df = load_mirror_df("Partecipanti")
 
 if df is None or df.empty:
     st.error("❌ Errore nel caricamento del foglio 'Partecipanti'. Controlla che esista e che il nome sia corretto.")
@@ -31,20 +30,37 @@ columns = [
     "Coinvolgimento", "Conoscenza tema", "Motivazione", "Obiettivo", 
     "Visione", "Valori", "Canale preferito"
 ]
-df = df[columns].dropna().reset_index(drop=True)
+# Tabella pulita e codici categorici con vocabolari stabili dal feature store
+feature = feature_partecipanti(df)
+df = feature["dati"][columns]
 
 # 🎛️ Separazione numeriche e categoriche
-df_encoded = df.copy()
-categorical_cols = df_encoded.select_dtypes(include='object').columns.tolist()
-numerical_cols = df_encoded.select_dtypes(exclude='object').columns.tolist()
-
-for col in categorical_cols:
-    df_encoded[col] = df_encoded[col].astype('category').cat.codes
-
-# 🧠 Clustering KPrototypes
-kproto = KPrototypes(n_clusters=4, init='Huang', random_state=42)
-categorical_idx = [df.columns.get_loc(col) for col in categorical_cols]
-df['Cluster'] = kproto.fit_predict(df_encoded, categorical=categorical_idx)
+categorical_cols = df.select_dtypes(include='object').columns.tolist()
+numerical_cols = df.select_dtypes(exclude='object').columns.tolist()
+
+# Le risposte testuali vuote restano una categoria (""), come nel foglio:
+# si escludono solo i partecipanti senza valori numerici
+df = df.assign(**{col: df[col].fillna("") for col in categorical_cols}).dropna(subset=numerical_cols)
+if len(df) != len(feature["dati"]):
+    st.warning(
+        f"⚠️ {len(feature['dati']) - len(df)} partecipanti esclusi dal clustering: "
+        f"valori mancanti in {', '.join(numerical_cols)}."
+    )
+# Codice 0 = risposta vuota (il feature store la codifica come -1)
+codici = feature["codici"].loc[df.index, categorical_cols].reset_index(drop=True) + 1
+vocabolari = {col: [""] + list(feature["vocabolari"][col]) for col in categorical_cols}
+df = df.reset_index(drop=True)
+
+# 🧠 Clustering KPrototypes: fit persistente per versione dei dati
+# (warm start se sono state aggiunte poche righe, opzionalmente in background)
+fit_background = st.sidebar.checkbox(
+    "Aggiorna i cluster in background", value=True,
+    help="La pagina mostra subito gli ultimi cluster noti mentre il nuovo fit è in corso."
+)
+risultato_cluster = cluster_partecipanti(df, categorical_cols, codici, vocabolari, background=fit_background)
+df['Cluster'] = risultato_cluster["etichette"]
+if risultato_cluster["stato"] == STATO_IN_AGGIORNAMENTO:
+    st.info("⏳ Nuove risposte: i cluster sono in aggiornamento, visualizzati gli ultimi cluster noti.")
 
 # ========== 📊 TAB 1: CLUSTER INSIGHT ==========
 with tab1:
@@ -58,10 +74,12 @@ with tab1:
     st.plotly_chart(fig)
 
     if st.button("🧠 Genera insight con Gemini", key="cluster_insight"):
+        from google import genai
         api_key = st.secrets["gemini"]["api_key"]
         client = genai.Client(api_key=api_key)
 
-        cluster_summary = df.groupby('Cluster').agg(lambda x: x.mode()[0] if x.dtype == 'object' else x.mean(numeric_only=True))
+        cluster_summary = risultato_cluster["riepilogo"]
+        persone_cluster = pd.crosstab(df['Cluster'], assegna_persona(df, st.session_state.get("quartiere")))
 
         prompt = f"""
         Sei un'amministrazione comunale che vuole valorizzare il verde urbano attraverso l'ascolto strutturato dei cittadini.
@@ -76,6 +94,9 @@ with tab1:
 
         Ecco i dati medi/modali per ciascun cluster:
         {cluster_summary.to_string()}
+
+        Distribuzione delle PersonaModel (regole del questionario) in ciascun cluster:
+        {persone_cluster.to_string()}
         """
 
         response = client.models.generate_content(
@@ -138,6 +159,7 @@ Formato atteso finale:
 """
 
     if st.button("📊 Analizza motivazioni con Gemini", key="analisi_pareto_ishikawa"):
+        from google import genai
         api_key = st.secrets["gemini"]["api_key"]
         client = genai.Client(api_key=api_key)
 
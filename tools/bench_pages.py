@@ -0,0 +1,143 @@
+# tools/bench_pages.py
+#
+# Benchmark delle pagine 2–6 con il backend finto dei fogli (lib.fake_sheets):
+# nessuna credenziale Google, latenza di rete simulata e dati sintetici
+# riproducibili (seed fisso).
+#
+# Uso:
+#   python tools/bench_pages.py --partecipanti 500 --latency-ms 250 --runs 3
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PAGES = [
+    "pages/2_Persona_Model.py",
+    "pages/3_Percezione_Cittadino.py",
+    "pages/4_Output_Tavolo_Rotondo.py",
+    "pages/5_Valutazione_Parchi.py",
+    "pages/6_Output_Analisi.py",
+]
+
+ELEMENTI_VERDE = [
+    "Accessibilità del verde",
+    "Biodiversità",
+    "Manutenzione e pulizia",
+    "Funzione sociale (es. luoghi di incontro)",
+    "Funzione ambientale (es. ombra, qualità aria)",
+]
+CRITERI = ["Accessibilità del verde", "Biodiversità", "Manutenzione e pulizia",
+           "Funzione sociale", "Funzione ambientale"]
+CRITERI_GREEN = ["Copertura arborea", "Permeabilità", "Manutenzione"]
+QUARTIERI = ["Città Alta", "Valtesse", "Redona", "Celadina"]
+TAVOLE = ["Tavola 1", "Tavola 2", "Tavola 3"]
+
+
+def genera_dati(n_partecipanti, n_parchi, seed=42):
+    from lib.ahp import matrici_da_giudizi, analizza, codifica_giudizi, numero_coppie
+
+    rnd = random.Random(seed)
+    partecipanti = [[
+        "timestamp", "id", "quartiere", "Nome", "Tavola rotonda", "Età", "Professione",
+        "Formazione", "Ruolo", "Ambito", "Esperienza", "Coinvolgimento", "Conoscenza tema",
+        "Motivazione", "Obiettivo", "Visione", "Valori", "Canale preferito",
+    ]]
+    # Stesse colonne e stesso ordine delle righe scritte dalla pagina 3
+    pesi = [["Timestamp", "ID Partecipante", "Tavola rotonda"] + ELEMENTI_VERDE + ["CR", "Giudizi", "Quartiere"]]
+    n = len(ELEMENTI_VERDE)
+    for i in range(n_partecipanti):
+        pid = f"P{i:06d}"
+        nome = f"Utente {i}"
+        tavola = rnd.choice(TAVOLE)
+        quartiere = rnd.choice(QUARTIERI)
+        partecipanti.append([
+            "2025-01-01 10:00:00", pid, quartiere, nome, tavola, rnd.randint(16, 80),
+            rnd.choice(["Studente", "Impiegato", "Pensionato"]),
+            rnd.choice(["Diploma", "Laurea"]),
+            rnd.choice(["Cittadino", "Tecnico/Esperto", "Rappresentante istituzionale"]),
+            rnd.choice(["Ambiente", "Sociale", "Mobilità"]),
+            rnd.choice(["Sì", "No"]), rnd.randint(1, 10), rnd.randint(1, 10),
+            "Migliorare il quartiere", "Più verde",
+            rnd.choice(["Conservativa", "Innovativa"]),
+            ", ".join(rnd.sample(["Innovazione", "Collaborazione", "Inclusione", "Sostenibilità"], 2)),
+            rnd.choice(["Email", "Social", "Incontri"]),
+        ])
+        # Giudizi casuali, più spesso "equamente" o lievi (indici bassi)
+        giudizi = rnd.choices(range(9), weights=[20, 4, 1, 1, 1, 4, 1, 1, 1], k=numero_coppie(n))
+        risultato = analizza(matrici_da_giudizi(giudizi, n)[0])
+        pesi.append(["2025-01-01 10:00:00", pid, tavola]
+                    + [round(float(w), 4) for w in risultato["pesi"][0]]
+                    + [round(float(risultato["cr"][0]), 4), codifica_giudizi(giudizi), quartiere])
+
+    parchi = [f"Parco {j}" for j in range(n_parchi)]
+    info = [["Nome del Parco", "Quartiere", "Descrizione", "Link immagine", "Latitudine", "Longitudine"]]
+    for j, parco in enumerate(parchi):
+        info.append([parco, QUARTIERI[j % len(QUARTIERI)], "Parco urbano", "",
+                     round(45.69 + rnd.random() / 50, 5), round(9.66 + rnd.random() / 50, 5)])
+
+    valutazioni = [["Timestamp", "ID Partecipante", "Tavola rotonda", "Quartiere", "Parco"] + CRITERI + ["Feedback"]]
+    for row in partecipanti[1:]:
+        for parco in rnd.sample(parchi, min(3, n_parchi)):
+            valutazioni.append(["01/01/2025 10:00:00", row[1], row[4], row[2], parco]
+                               + [rnd.randint(1, 5) for _ in CRITERI] + [""])
+
+    valutazioni_green = [["Timestamp", "Parco"] + CRITERI_GREEN]
+    for parco in parchi:
+        valutazioni_green.append(["01/01/2025", parco] + [rnd.randint(1, 5) for _ in CRITERI_GREEN])
+    pesi_green = [["Timestamp", "Utente", "Index", "Persona"] + CRITERI_GREEN,
+                  ["01/01/2025", "Esperto", 1, "Agronomo", 40, 35, 25]]
+
+    return {
+        "Partecipanti": partecipanti,
+        "Pesi Parametri": pesi,
+        "Informazioni Parchi": info,
+        "Valutazione Parchi": valutazioni,
+        "Valutazione Parchi Verde": valutazioni_green,
+        "Pesi Parametri Verde": pesi_green,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline delle pagine 2–6")
+    parser.add_argument("--partecipanti", type=int, default=200)
+    parser.add_argument("--parchi", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    # Il backend si configura con variabili d'ambiente lette all'import di lib
+    workdir = tempfile.mkdtemp(prefix="bench_pages_")
+    os.environ["SHEETS_BACKEND"] = "fake"
+    os.environ["FAKE_SHEETS_DIR"] = workdir
+    os.environ["FAKE_SHEETS_LATENCY_MS"] = str(args.latency_ms)
+    os.environ["MIRROR_DB_PATH"] = os.path.join(workdir, "mirror.sqlite")
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+
+    from streamlit.testing.v1 import AppTest
+    from lib.fake_sheets import seed_worksheet
+
+    for worksheet_name, rows in genera_dati(args.partecipanti, args.parchi).items():
+        seed_worksheet("Dati_Partecipante", worksheet_name, rows)
+
+    print(f"{'pagina':40} {'run':>4} {'secondi':>9}  eccezioni")
+    for page in PAGES:
+        for run in range(1, args.runs + 1):
+            at = AppTest.from_file(os.path.join(ROOT, page), default_timeout=120)
+            at.session_state["logged_in"] = True
+            at.session_state["id_partecipante"] = "BENCH000000000000"
+            at.session_state["tavola_rotonda"] = TAVOLE[0]
+            start = time.perf_counter()
+            at.run()
+            elapsed = time.perf_counter() - start
+            errors = len(at.exception)
+            print(f"{page:40} {run:>4} {elapsed:>9.3f}  {errors}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# tools/import_budget.py
+#
+# Budget del tempo di import delle pagine di analisi.
+# Per ogni pagina si eseguono, in un interprete nuovo (cold start), solo gli
+# import di primo livello del file, cioè quelli pagati prima del primo
+# rendering. Per ogni pagina si misura il tempo e si verifica che nessuna
+# libreria pesante sia caricata prima che l'utente scelga l'analisi.
+#
+# Uso:
+#   python tools/import_budget.py --runs 3
+#   python tools/import_budget.py --scala 2   # budget raddoppiati (macchine lente)
+# Esce con codice 1 se una pagina supera il budget.
+
+import os
+import ast
+import sys
+import json
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Librerie che non devono essere caricate all'apertura della pagina
+PESANTI = ["sklearn", "scipy", "statsmodels", "scikit_posthocs", "seaborn",
+           "matplotlib", "joblib", "google.genai"]
+
+# Budget in millisecondi per gli import di primo livello, e librerie vietate.
+# PROVVISORI: non ancora misurati sull'immagine di deploy (Dockerfile) con
+# dipendenze fissate. Da aggiornare con l'output di questo script eseguito
+# lì (--runs 5), lasciando un margine sulla misura peggiore.
+BUDGET = {
+    "pages/2_Persona_Model.py": {"ms": 1750, "vietati": PESANTI},
+    "pages/4_Output_Tavolo_Rotondo.py": {"ms": 1700, "vietati": PESANTI},
+    "pages/99_Persona_Model_LLM.py": {"ms": 1800, "vietati": PESANTI + ["kmodes"]},
+}
+
+SONDA = """
+import sys, time, json
+t0 = time.perf_counter()
+{imports}
+ms = (time.perf_counter() - t0) * 1000
+print(json.dumps({{"ms": ms, "moduli": sorted(sys.modules)}}))
+"""
+
+
+def import_di_primo_livello(path):
+    with open(os.path.join(ROOT, path), encoding="utf-8") as f:
+        albero = ast.parse(f.read(), filename=path)
+    return [ast.unparse(nodo) for nodo in albero.body if isinstance(nodo, (ast.Import, ast.ImportFrom))]
+
+
+def misura(path):
+    codice = SONDA.format(imports="\n".join(import_di_primo_livello(path)))
+    esito = subprocess.run(
+        [sys.executable, "-c", codice], cwd=ROOT, capture_output=True, text=True,
+        env={**os.environ, "PYTHONPATH": ROOT},
+    )
+    if esito.returncode != 0:
+        raise RuntimeError(esito.stderr.strip().splitlines()[-1] if esito.stderr else "errore sconosciuto")
+    return json.loads(esito.stdout.strip().splitlines()[-1])
+
+
+def caricati(moduli, vietati):
+    return sorted({v for v in vietati for m in moduli if m == v or m.startswith(v + ".")})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Budget del tempo di import delle pagine")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--scala", type=float, default=1.0, help="moltiplicatore dei budget")
+    args = parser.parse_args()
+
+    superato = False
+    print(f"{'pagina':36} {'ms':>8} {'budget':>8}  esito")
+    for pagina, budget in BUDGET.items():
+        try:
+            misure = [misura(pagina) for _ in range(args.runs)]
+        except RuntimeError as e:
+            print(f"{pagina:36} {'-':>8} {'-':>8}  ERRORE: {e}")
+            superato = True
+            continue
+        ms = min(m["ms"] for m in misure)
+        limite = budget["ms"] * args.scala
+        pesanti = caricati(misure[0]["moduli"], budget["vietati"])
+        ok = ms <= limite and not pesanti
+        superato |= not ok
+        dettaglio = "ok" if ok else "SUPERATO"
+        if pesanti:
+            dettaglio += f" (caricati: {', '.join(pesanti)})"
+        print(f"{pagina:36} {ms:>8.0f} {limite:>8.0f}  {dettaglio}")
+    sys.exit(1 if superato else 0)
+
+
+if __name__ == "__main__":
+    main()